@@ -0,0 +1,240 @@
+# audit_writer.py – buffered, group-committing audit log writer for the NBFC MCP server
+
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("none", "batch", "event")
+
+# live files of per-process writers: <name>.<pid>.log
+PER_PROCESS_LOG = re.compile(r"^(?P<name>.+)\.(?P<pid>\d+)\.log$")
+
+
+class AuditQueueFull(Exception):
+    """Raised when the audit queue stays full for longer than the put timeout."""
+
+
+def _segment_path(path: str, segment_dir: str) -> str:
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    base = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(segment_dir, f"{base}-{stamp}.log")
+
+
+def _run_hook(on_rotate: Optional[Callable[[str], None]], segment: str) -> None:
+    if on_rotate:
+        try:
+            on_rotate(segment)
+        except Exception as e:
+            logger.error("audit on_rotate hook failed for %s: %s", segment, e)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def rotate_orphaned_logs(
+    log_dir: str, segment_dir: str, on_rotate: Optional[Callable[[str], None]] = None
+) -> List[str]:
+    """
+    Move the live files of per-process writers whose process has exited (a previous
+    deploy's workers) into segment_dir, as if their owner had rotated them, so they are
+    compressed and expired like any other segment. Empty files are just removed.
+    Returns the new segment paths. Safe to run from several starting workers at once.
+    """
+    os.makedirs(segment_dir, exist_ok=True)
+    segments = []
+    for entry in os.scandir(log_dir):
+        m = PER_PROCESS_LOG.match(entry.name)
+        if not m or not entry.is_file():
+            continue
+        pid = int(m.group("pid"))
+        if pid == os.getpid() or _pid_alive(pid):
+            continue
+        try:
+            if entry.stat().st_size == 0:
+                os.remove(entry.path)
+                continue
+            segment = _segment_path(entry.path, segment_dir)
+            os.replace(entry.path, segment)
+        except FileNotFoundError:
+            continue  # another worker got to it first
+        segments.append(segment)
+        _run_hook(on_rotate, segment)
+    return segments
+
+
+class AuditWriter:
+    """
+    Audit lines are queued in memory and written by one background thread. Each wake-up
+    drains everything queued (up to batch_size lines) into a single write, so a burst of
+    events costs one write/flush/fsync instead of one open/append/close per event.
+
+    fsync policy: "none" leaves durability to the OS, "batch" fsyncs once per group
+    commit, "event" fsyncs after every line. The live file is rotated into segment_dir
+    once it passes max_bytes or has been open for rotate_seconds.
+
+    Every queued line gets a Future that the flusher completes once the line is written
+    under the policy (fsynced, for "batch" and "event"), or fails with the commit error,
+    so callers that need durability can wait for it before acknowledging.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        segment_dir: str,
+        fsync: str = "batch",
+        queue_size: int = 10000,
+        batch_size: int = 1000,
+        flush_interval: float = 0.05,
+        max_bytes: int = 64 * 1024 * 1024,
+        rotate_seconds: float = 24 * 3600,
+        put_timeout: float = 2.0,
+        on_rotate: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = path
+        self.segment_dir = segment_dir
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.put_timeout = put_timeout
+        self.on_rotate = on_rotate
+
+        os.makedirs(segment_dir, exist_ok=True)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue(maxsize=queue_size)
+        self._closed = threading.Event()
+        self._file = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._open()
+
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    # --- producer side
+
+    def offer(self, line: str) -> Optional[Future]:
+        """Queue a line without blocking. Returns its write future, or None when the queue is full."""
+        written: Future = Future()
+        try:
+            self._queue.put_nowait((line, written))
+        except queue.Full:
+            return None
+        return written
+
+    def put(self, line: str) -> Future:
+        """Queue a line, blocking up to put_timeout while the flusher catches up."""
+        written: Future = Future()
+        try:
+            self._queue.put((line, written), timeout=self.put_timeout)
+        except queue.Full:
+            raise AuditQueueFull(f"audit queue full ({self._queue.maxsize} lines)")
+        return written
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until everything queued so far has been written (or timeout expires)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(0.005)
+
+    def close(self) -> None:
+        self._closed.set()
+        self._thread.join()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    # --- flusher side
+
+    def _open(self) -> None:
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        segment = _segment_path(self.path, self.segment_dir)
+        os.replace(self.path, segment)
+        self._open()
+        _run_hook(self.on_rotate, segment)
+
+    def _needs_rotation(self, incoming: int) -> bool:
+        if self._size == 0:
+            return False
+        if self._size + incoming > self.max_bytes:
+            return True
+        return time.time() - self._opened_at >= self.rotate_seconds
+
+    def _drain(self) -> List[Tuple[str, Future]]:
+        try:
+            lines = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(lines) < self.batch_size:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def _commit(self, lines: List[Tuple[str, Future]]) -> None:
+        payload = [line.encode("utf-8") for line, _ in lines]
+        if self._needs_rotation(sum(len(p) for p in payload)):
+            self._rotate()
+
+        if self.fsync == "event":
+            for p, (_, written) in zip(payload, lines):
+                self._file.write(p)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._size += len(p)
+                written.set_result(None)
+            return
+        self._file.write(b"".join(payload))
+        self._file.flush()
+        if self.fsync == "batch":
+            os.fsync(self._file.fileno())
+        self._size += sum(len(p) for p in payload)
+        for _, written in lines:
+            written.set_result(None)
+
+    def _run(self) -> None:
+        while not (self._closed.is_set() and self._queue.empty()):
+            lines = self._drain()
+            if not lines:
+                if self._size and time.time() - self._opened_at >= self.rotate_seconds:
+                    self._rotate()
+                continue
+            try:
+                self._commit(lines)
+            except Exception as e:
+                logger.error("audit writer failed to commit %d lines: %s", len(lines), e)
+                for _, written in lines:
+                    if not written.done():
+                        written.set_exception(e)
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
@@ -0,0 +1,440 @@
+# blob_store.py – content-addressed, deduplicated document storage for the NBFC MCP server
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Tuple
+
+from compression import (
+    MIN_SAVING_RATIO, SAMPLE_BYTES, SUFFIXES, Codec, codec_for, compress_file, worth_compressing,
+)
+
+# resource names handed out by the store: <sha256 hex><ext>
+BLOB_NAME = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,8})?$")
+# documents written before the store existed, flat in STORAGE_DIR: <kind>_<customer id>_<uuid hex>.pdf
+LEGACY_NAME = re.compile(r"^(salary|sanction)_[A-Za-z0-9]+_[0-9a-f]{32}\.pdf$")
+
+_COPY_CHUNK = 1024 * 1024
+# decompressing readers kept open between ranged reads of compressed blobs
+_MAX_PARKED_READERS = 16
+
+# "none": rely on the OS to flush, "file": fsync each new blob before it is renamed
+# into place, "full": also fsync the directory so the rename itself survives a crash
+DURABILITY_MODES = ("none", "file", "full")
+
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@dataclass
+class BlobRef:
+    digest: str
+    name: str
+    path: str
+    size: int
+    created: bool  # False when an identical blob was already stored
+    codec: str = ""  # compression of the file at path, "" when stored raw
+
+
+class BlobStore:
+    """
+    Blobs live at <root>/<aa>/<bb>/<sha256><ext>, so identical payloads are stored once
+    and a name resolves to a path without touching the index or listing a directory.
+    A SQLite index keeps size, kind, last access and the holders referencing each blob
+    (the customer a document was stored for): a put adds the holder's reference unless
+    it already has one, and decref() drops it again, so releasing twice or releasing
+    someone else's reference is refused rather than counted. refcount is the number of
+    holders. Retention evicts blobs left with no references, and drops the references
+    of blobs unused for their kind's TTL.
+
+    With a codec, compressible payloads are stored compressed as <sha256><ext><suffix>
+    (e.g. .pdf.gz); names, digests and sizes always refer to the original bytes, and
+    open() decompresses transparently. Payloads that fail the compressibility check,
+    or that a change of codec left in another format, are read as they are.
+
+    New blobs are written to a temp file and renamed into place, so readers never see a
+    partial file; `durability` picks how much is fsynced on the way.
+    """
+
+    def __init__(self, root: str, codec: Optional[Codec] = None, durability: str = "file") -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        self.root = root
+        self.codec = codec
+        self.durability = durability
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.index_path = os.path.join(root, "index.db")
+        self._local = threading.local()
+        self._parked: List[Tuple[str, BinaryIO]] = []
+        self._parked_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    ext TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    refcount INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    codec TEXT NOT NULL DEFAULT '',
+                    stored_size INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+                """
+            )
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(blobs)")}
+            if "codec" not in columns:
+                # index from before compression: everything is raw, usage moves to bytes on disk
+                conn.execute("ALTER TABLE blobs ADD COLUMN codec TEXT NOT NULL DEFAULT ''")
+                conn.execute("ALTER TABLE blobs ADD COLUMN stored_size INTEGER NOT NULL DEFAULT 0")
+                conn.execute("UPDATE blobs SET stored_size = size")
+                conn.execute("DROP TRIGGER IF EXISTS blob_usage_insert")
+                conn.execute("DROP TRIGGER IF EXISTS blob_usage_delete")
+                conn.execute("DELETE FROM blob_usage")
+            has_refs = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blob_refs'"
+            ).fetchone()
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS blob_refs (
+                    digest TEXT NOT NULL,
+                    holder TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (digest, holder)
+                ) WITHOUT ROWID
+                """
+            )
+            if not has_refs:
+                # bare counts from before holders were tracked become one anonymous holder,
+                # which no customer can release; they still expire under the kind's TTL
+                conn.execute("INSERT OR IGNORE INTO blob_refs SELECT digest, '', created_at FROM blobs WHERE refcount > 0")
+                conn.execute("UPDATE blobs SET refcount = 1 WHERE refcount > 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_kind_access ON blobs(kind, last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_ref_access ON blobs(refcount, last_access)")
+            # running total of bytes on disk so quota checks never SUM over the whole index
+            conn.execute("CREATE TABLE IF NOT EXISTS blob_usage (id INTEGER PRIMARY KEY CHECK (id = 1), total_bytes INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO blob_usage (id, total_bytes) SELECT 1, COALESCE(SUM(stored_size), 0) FROM blobs")
+            conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS blob_usage_insert AFTER INSERT ON blobs
+                BEGIN UPDATE blob_usage SET total_bytes = total_bytes + NEW.stored_size WHERE id = 1; END
+                """
+            )
+            conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS blob_usage_delete AFTER DELETE ON blobs
+                BEGIN UPDATE blob_usage SET total_bytes = total_bytes - OLD.stored_size WHERE id = 1; END
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- naming
+
+    def path_for(self, digest: str, ext: str = "") -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + ext)
+
+    def _find(self, digest: str, ext: str, raw_only: bool = False) -> Optional[Tuple[str, str]]:
+        """(path, codec name) of the stored file for a blob, trying the configured codec first."""
+        base = self.path_for(digest, ext)
+        suffixes = [""]
+        if not raw_only:
+            suffixes += [self.codec.suffix] if self.codec else []
+            suffixes += [s for s in SUFFIXES if s not in suffixes]
+        for suffix in suffixes:
+            if os.path.exists(base + suffix):
+                return base + suffix, SUFFIXES.get(suffix, "")
+        return None
+
+    def locate(self, name: str) -> Optional[Tuple[str, str]]:
+        """Map a blob resource name to (path, codec name), or None if it is not a stored blob."""
+        m = BLOB_NAME.match(name)
+        if not m:
+            return None
+        return self._find(m.group(1), m.group(2) or "")
+
+    @staticmethod
+    def open_stored(path: str, codec: str) -> BinaryIO:
+        """Read a stored file as its original bytes."""
+        return codec_for(codec).open_read(path) if codec else open(path, "rb")
+
+    def read_range(self, path: str, codec: str, offset: int, length: int) -> bytes:
+        """
+        Up to `length` original bytes of a stored file from `offset`. A compressed file
+        can only be read forward from its start, so the reader is kept open afterwards
+        and a later read at or past where it stopped (the next chunk of a download)
+        carries on from there instead of decompressing everything before it again.
+        """
+        if not codec:
+            with open(path, "rb") as f:
+                return os.pread(f.fileno(), length, offset)
+        reader = self._unpark(path, offset) or self.open_stored(path, codec)
+        try:
+            reader.seek(offset)
+            data = reader.read(length)
+        except BaseException:
+            reader.close()
+            raise
+        self._park(path, reader)
+        return data
+
+    def _unpark(self, path: str, offset: int) -> Optional[BinaryIO]:
+        """Take the parked reader of path that stopped closest before offset, if any."""
+        with self._parked_lock:
+            best = None
+            for i, (parked_path, reader) in enumerate(self._parked):
+                if parked_path == path and reader.tell() <= offset:
+                    if best is None or reader.tell() > self._parked[best][1].tell():
+                        best = i
+            return self._parked.pop(best)[1] if best is not None else None
+
+    def _park(self, path: str, reader: BinaryIO) -> None:
+        with self._parked_lock:
+            self._parked.append((path, reader))
+            evicted = self._parked[:-_MAX_PARKED_READERS]
+            del self._parked[:-_MAX_PARKED_READERS]
+        for _, old in evicted:
+            old.close()
+
+    def size(self, digest: str) -> Optional[int]:
+        """Original (uncompressed) size of an indexed blob."""
+        row = self._conn().execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        return row["size"] if row else None
+
+    # --- writes
+
+    def put_bytes(
+        self, data: bytes, kind: str, ext: str = "", compress: bool = True, holder: str = ""
+    ) -> BlobRef:
+        """
+        Store data and add holder's reference. With compress=False the blob is kept (and
+        found) as raw bytes only, for callers that hand out its path as a readable file.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        raw_only = not compress
+        found = self._find(digest, ext, raw_only)
+        created = False
+        if found is None:
+            found, created = self._write_new(data, digest, ext, compress)
+        path, codec = found
+        ref = self._add_ref(digest, ext, kind, len(data), os.path.getsize(path), codec, path, created, holder)
+        if self._find(digest, ext, raw_only) is None:
+            # the sweeper evicted the old copy between our exists check and add_ref
+            self._write_new(data, digest, ext, compress)
+        return ref
+
+    def _write_new(
+        self, data: bytes, digest: str, ext: str, compress: bool = True
+    ) -> Tuple[Tuple[str, str], bool]:
+        codec = self.codec if compress and self.codec and worth_compressing(data[:SAMPLE_BYTES]) else None
+        payload = codec.compress(data) if codec else data
+        if codec and len(payload) >= MIN_SAVING_RATIO * len(data):
+            codec, payload = None, data
+        path = self.path_for(digest, ext + (codec.suffix if codec else ""))
+        tmp = self._tmp_path()
+        with open(tmp, "wb") as f:
+            f.write(payload)
+            if self.durability != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        return (path, codec.name if codec else ""), self._publish(tmp, path)
+
+    def put_file(
+        self,
+        src: str,
+        kind: str,
+        ext: str = "",
+        expected_digest: Optional[str] = None,
+        holder: str = "",
+    ) -> BlobRef:
+        """
+        Move a finished file into the store (hashed and compressed in chunks, never fully
+        loaded) and add holder's reference. Raises ValueError, leaving src in place, if it
+        does not hash to expected_digest.
+        """
+        h = hashlib.sha256()
+        size = 0
+        sample = b""
+        with open(src, "rb") as f:
+            for chunk in iter(lambda: f.read(_COPY_CHUNK), b""):
+                if not sample:
+                    sample = chunk[:SAMPLE_BYTES]
+                h.update(chunk)
+                size += len(chunk)
+        digest = h.hexdigest()
+        if expected_digest and digest != expected_digest:
+            raise ValueError(f"checksum mismatch: expected sha256 {expected_digest}, got {digest}")
+
+        found = self._find(digest, ext)
+        if found is not None:
+            path, codec = found
+            ref = self._add_ref(
+                digest, ext, kind, size, os.path.getsize(path), codec, path, created=False, holder=holder
+            )
+            if self._find(digest, ext) is not None:
+                os.remove(src)
+                return ref
+            # the sweeper evicted the old copy between our exists check and add_ref;
+            # src is the only copy left, so publish it under the reference just added
+            publish, codec, _ = self._prepare_file(src, sample, size)
+            ref.path, ref.codec = self._publish_file(src, publish, codec, digest, ext), codec
+            return ref
+
+        publish, codec, stored = self._prepare_file(src, sample, size)
+        path = self.path_for(digest, ext + (self.codec.suffix if codec else ""))
+        ref = self._add_ref(digest, ext, kind, size, stored, codec, path, created=True, holder=holder)
+        self._publish_file(src, publish, codec, digest, ext)
+        return ref
+
+    def _prepare_file(self, src: str, sample: bytes, size: int) -> Tuple[str, str, int]:
+        """(file to publish, codec name, stored size): a compressed temp copy of src, or src itself."""
+        publish, codec, stored = src, "", size
+        if self.codec and worth_compressing(sample):
+            tmp = self._tmp_path()
+            stored = compress_file(src, tmp, self.codec)
+            if stored < MIN_SAVING_RATIO * size:
+                publish, codec = tmp, self.codec.name
+            else:
+                os.remove(tmp)
+                stored = size
+        if self.durability != "none":
+            _fsync_path(publish)
+        return publish, codec, stored
+
+    def _publish_file(self, src: str, publish: str, codec: str, digest: str, ext: str) -> str:
+        path = self.path_for(digest, ext + (self.codec.suffix if codec else ""))
+        self._publish(publish, path)
+        if publish != src:
+            os.remove(src)
+        return path
+
+    def _tmp_path(self) -> str:
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    def _publish(self, tmp: str, path: str) -> bool:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # a concurrent writer may publish the same digest first; the bytes are identical
+        created = not os.path.exists(path)
+        os.replace(tmp, path)
+        if self.durability == "full":
+            _fsync_path(os.path.dirname(path))
+        return created
+
+    def _add_ref(
+        self,
+        digest: str,
+        ext: str,
+        kind: str,
+        size: int,
+        stored_size: int,
+        codec: str,
+        path: str,
+        created: bool,
+        holder: str,
+    ) -> BlobRef:
+        now = time.time()
+        with self._conn() as conn:
+            added = conn.execute(
+                "INSERT OR IGNORE INTO blob_refs (digest, holder, created_at) VALUES (?, ?, ?)",
+                (digest, holder, now),
+            ).rowcount
+            conn.execute(
+                """
+                INSERT INTO blobs (digest, ext, kind, size, refcount, created_at, last_access, codec, stored_size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(digest) DO UPDATE SET
+                    refcount = refcount + excluded.refcount, last_access = excluded.last_access
+                """,
+                (digest, ext, kind, size, added, now, now, codec, stored_size),
+            )
+        return BlobRef(digest, digest + ext, path, size, created, codec)
+
+    # --- references
+
+    def decref(self, digest: str, holder: str = "") -> Optional[int]:
+        """
+        Drop holder's reference. Returns the references left, or None when holder has no
+        reference to the blob (never had one, already released it, or it expired).
+        """
+        with self._conn() as conn:
+            cur = conn.execute("DELETE FROM blob_refs WHERE digest = ? AND holder = ?", (digest, holder))
+            if cur.rowcount != 1:
+                return None
+            conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE digest = ?", (digest,))
+            return conn.execute(
+                "SELECT refcount FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()["refcount"]
+
+    def touch(self, digest: str) -> None:
+        with self._conn() as conn:
+            conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+
+    # --- retention
+
+    def total_bytes(self) -> int:
+        return self._conn().execute("SELECT total_bytes FROM blob_usage WHERE id = 1").fetchone()[0]
+
+    def expire(self, kind: str, older_than: float, limit: int) -> int:
+        """Drop every reference to up to `limit` blobs of kind not accessed since older_than."""
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            digests = [
+                (r["digest"],) for r in conn.execute(
+                    "SELECT digest FROM blobs WHERE kind = ? AND last_access < ? AND refcount > 0 LIMIT ?",
+                    (kind, older_than, limit),
+                )
+            ]
+            conn.executemany("DELETE FROM blob_refs WHERE digest = ?", digests)
+            conn.executemany("UPDATE blobs SET refcount = 0 WHERE digest = ?", digests)
+        return len(digests)
+
+    def least_recently_used_unreferenced(self, limit: int) -> List[Tuple[str, str]]:
+        rows = self._conn().execute(
+            "SELECT digest, ext FROM blobs WHERE refcount = 0 ORDER BY last_access LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [(r["digest"], r["ext"]) for r in rows]
+
+    def remove_unreferenced(self, digest: str, ext: str) -> bool:
+        """
+        Delete a blob if it is still unreferenced. Returns True if it was removed.
+
+        The refcount check, the unlink and the row delete run under one write lock
+        (BEGIN IMMEDIATE), so a put's _add_ref either lands first and keeps the blob, or
+        waits until the row is gone and finds the file missing on its re-check.
+        """
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT refcount FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None or row["refcount"] != 0:
+                return False
+            while True:
+                found = self._find(digest, ext)
+                if found is None:
+                    break
+                try:
+                    os.remove(found[0])
+                except FileNotFoundError:
+                    pass
+            conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        return True
@@ -0,0 +1,120 @@
+# compression.py – codecs for stored documents and rotated audit segments
+
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import zlib
+from typing import BinaryIO, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional; only needed for MCP_STORAGE_COMPRESSION=zstd
+    zstandard = None
+
+# bytes sampled from the head of a payload to decide whether compressing it pays off
+SAMPLE_BYTES = 64 * 1024
+# store raw unless the sample shrinks below this fraction at the fastest zlib level;
+# PDFs with compressed streams, JPEGs and zip containers land well above it
+MIN_SAVING_RATIO = 0.9
+# payloads smaller than this are never worth a codec header
+MIN_COMPRESS_BYTES = 512
+
+_COPY_CHUNK = 1024 * 1024
+
+
+class Codec:
+    """A named compression format with its file suffix and a default level."""
+
+    def __init__(self, name: str, suffix: str, level: int) -> None:
+        self.name = name
+        self.suffix = suffix
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "gzip":
+            return gzip.compress(data, compresslevel=self.level, mtime=0)
+        if self.name == "lzma":
+            return lzma.compress(data, preset=self.level)
+        if self.name == "bz2":
+            return bz2.compress(data, compresslevel=self.level)
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def open_read(self, path: str) -> BinaryIO:
+        """Decompressing reader; seek() works, forward by decompressing and discarding."""
+        if self.name == "gzip":
+            return gzip.open(path, "rb")
+        if self.name == "lzma":
+            return lzma.open(path, "rb")
+        if self.name == "bz2":
+            return bz2.open(path, "rb")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+    def open_write(self, path: str) -> BinaryIO:
+        if self.name == "gzip":
+            return gzip.GzipFile(path, "wb", compresslevel=self.level, mtime=0)
+        if self.name == "lzma":
+            return lzma.open(path, "wb", preset=self.level)
+        if self.name == "bz2":
+            return bz2.open(path, "wb", compresslevel=self.level)
+        return zstandard.ZstdCompressor(level=self.level).stream_writer(open(path, "wb"), closefd=True)
+
+
+_CODECS: Dict[str, Codec] = {
+    "gzip": Codec("gzip", ".gz", 6),
+    "lzma": Codec("lzma", ".xz", 6),
+    "bz2": Codec("bz2", ".bz2", 9),
+    "zstd": Codec("zstd", ".zst", 3),
+}
+SUFFIXES = {c.suffix: c.name for c in _CODECS.values()}
+
+
+def get_codec(name: str, level: Optional[int] = None) -> Optional[Codec]:
+    """Codec by name ("none" or "" gives None). Raises ValueError for unknown or unavailable codecs."""
+    if name in ("", "none"):
+        return None
+    base = _CODECS.get(name)
+    if base is None:
+        raise ValueError(f"unknown compression codec {name!r}, expected one of none, {', '.join(_CODECS)}")
+    if name == "zstd" and zstandard is None:
+        raise ValueError("compression codec zstd needs the zstandard package")
+    return Codec(base.name, base.suffix, base.level if level is None else level)
+
+
+def codec_for(name: str) -> Codec:
+    """Codec to read a file that was written with `name`, whatever is configured now."""
+    codec = get_codec(name)
+    if codec is None:
+        raise ValueError("not a compressed codec: none")
+    return codec
+
+
+def worth_compressing(sample: bytes) -> bool:
+    """Cheap compressibility check: does a fast zlib pass over the sample save at least 10%?"""
+    if len(sample) < MIN_COMPRESS_BYTES:
+        return False
+    sample = sample[:SAMPLE_BYTES]
+    return len(zlib.compress(sample, 1)) < MIN_SAVING_RATIO * len(sample)
+
+
+def compress_file(src: str, dst: str, codec: Codec) -> int:
+    """Stream src into dst with codec; returns the size of dst."""
+    with open(src, "rb") as fin, codec.open_write(dst) as fout:
+        shutil.copyfileobj(fin, fout, _COPY_CHUNK)
+    return os.path.getsize(dst)
+
+
+def compress_segment(path: str, codec: Codec) -> str:
+    """
+    Compress a closed log segment next to itself and delete the original. The
+    compressed file keeps the segment's mtime so retention ages it from rotation.
+    """
+    st = os.stat(path)
+    dst = path + codec.suffix
+    tmp = dst + ".tmp"
+    compress_file(path, tmp, codec)
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp, dst)
+    os.remove(path)
+    return dst
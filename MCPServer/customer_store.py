@@ -0,0 +1,220 @@
+# customer_store.py – pluggable customer repository for the NBFC MCP server
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Column order of the customer record, shared by every backend
+CUSTOMER_FIELDS = (
+    "customer_id",
+    "name",
+    "age",
+    "city",
+    "phone",
+    "email",
+    "pre_approved_limit",
+    "salary_monthly",
+    "credit_score",
+)
+
+
+class CustomerRepository(ABC):
+    """Interface the MCP tools use to read customers. Backends only load the rows asked for."""
+
+    def __init__(self) -> None:
+        self._listeners: List[Callable[[List[str]], None]] = []
+
+    def add_change_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Register a callback run with the customer_ids written by upsert_many (e.g. cache invalidation)."""
+        self._listeners.append(listener)
+
+    def _notify(self, customer_ids: List[str]) -> None:
+        for listener in self._listeners:
+            listener(customer_ids)
+
+    @abstractmethod
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """The customer record, or None."""
+
+    def get_many(self, customer_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for cid in customer_ids:
+            cust = self.get(cid)
+            if cust:
+                found[cid] = cust
+        return found
+
+    def exists(self, customer_id: str) -> bool:
+        return self.get(customer_id) is not None
+
+    @abstractmethod
+    def find_by_phone(self, phone: str) -> Optional[Dict[str, Any]]:
+        """The customer with this phone number, or None."""
+
+    @abstractmethod
+    def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """The customer with this email address, or None."""
+
+    @abstractmethod
+    def upsert_many(self, customers: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace customers; returns how many were written."""
+
+    @abstractmethod
+    def is_empty(self) -> bool:
+        """True when the store holds no customers."""
+
+
+class InMemoryCustomerRepository(CustomerRepository):
+    """Dict-backed repository, handy for tests and tiny demo datasets."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_phone: Dict[str, str] = {}
+        self._by_email: Dict[str, str] = {}
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(customer_id)
+
+    def find_by_phone(self, phone: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(self._by_phone.get(phone, ""))
+
+    def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(self._by_email.get(email, ""))
+
+    def upsert_many(self, customers: Iterable[Dict[str, Any]]) -> int:
+        written = []
+        for cust in customers:
+            record = {f: cust.get(f) for f in CUSTOMER_FIELDS}
+            cid = record["customer_id"]
+            old = self._by_id.get(cid)
+            if old:
+                # a changed phone or email must stop finding this customer
+                if self._by_phone.get(old["phone"]) == cid:
+                    del self._by_phone[old["phone"]]
+                if self._by_email.get(old["email"]) == cid:
+                    del self._by_email[old["email"]]
+            self._by_id[cid] = record
+            self._by_phone[record["phone"]] = cid
+            self._by_email[record["email"]] = cid
+            written.append(cid)
+        self._notify(written)
+        return len(written)
+
+    def is_empty(self) -> bool:
+        return not self._by_id
+
+
+class SQLiteCustomerRepository(CustomerRepository):
+    """
+    SQLite-backed repository. customer_id is the clustered primary key and phone/email
+    carry secondary indexes, so every lookup is a single index probe.
+    """
+
+    # SQLite caps the number of bound parameters per statement
+    _IN_CHUNK = 500
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        # one connection per thread; sqlite3 connections must not be shared across threads
+        self._local = threading.local()
+        self._create_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS customers (
+                    customer_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    age INTEGER,
+                    city TEXT,
+                    phone TEXT,
+                    email TEXT,
+                    pre_approved_limit INTEGER,
+                    salary_monthly INTEGER,
+                    credit_score INTEGER
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email)")
+
+    def _one(self, where: str, value: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            f"SELECT * FROM customers WHERE {where} = ? LIMIT 1", (value,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        return self._one("customer_id", customer_id)
+
+    def get_many(self, customer_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids: List[str] = list(dict.fromkeys(customer_ids))
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(ids), self._IN_CHUNK):
+            chunk = ids[i:i + self._IN_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f"SELECT * FROM customers WHERE customer_id IN ({marks})", chunk
+            ):
+                found[row["customer_id"]] = dict(row)
+        return found
+
+    def exists(self, customer_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM customers WHERE customer_id = ?", (customer_id,)
+        ).fetchone()
+        return row is not None
+
+    def find_by_phone(self, phone: str) -> Optional[Dict[str, Any]]:
+        return self._one("phone", phone)
+
+    def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self._one("email", email)
+
+    def upsert_many(self, customers: Iterable[Dict[str, Any]]) -> int:
+        cols = ",".join(CUSTOMER_FIELDS)
+        marks = ",".join("?" * len(CUSTOMER_FIELDS))
+        rows = [tuple(c.get(f) for f in CUSTOMER_FIELDS) for c in customers]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO customers ({cols}) VALUES ({marks})", rows
+            )
+        if self._listeners:
+            self._notify([r[0] for r in rows])
+        return len(rows)
+
+    def is_empty(self) -> bool:
+        return self._conn().execute("SELECT 1 FROM customers LIMIT 1").fetchone() is None
+
+
+def open_customer_repository(url: str) -> CustomerRepository:
+    """
+    Open a repository from a store URL:
+      sqlite:///path/to/customers.db   (default, on-disk and indexed)
+      memory://                        (in-process dict)
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteCustomerRepository(url[len("sqlite:///"):])
+    if url.startswith("memory://"):
+        return InMemoryCustomerRepository()
+    raise ValueError(f"unsupported customer store: {url}")
@@ -0,0 +1,68 @@
+# emi.py – EMI (equated monthly instalment) math: float fast path and Decimal reference
+
+import math
+from decimal import Decimal
+
+import numpy as np
+
+# float64 agrees with the Decimal reference far more closely than a paisa, so the only
+# results that can round differently are those sitting right on a half-paisa tie. The
+# error of the float formula grows with the size of the EMI, hence a relative margin
+# (about 1000x the worst error seen over 600-month tenures) on top of an absolute one.
+_TIE_ABS_TOLERANCE = 1e-6
+_TIE_REL_TOLERANCE = 1e-11
+
+
+def compute_emi_decimal(P: float, annual_rate: float, n_months: int) -> float:
+    """Reference EMI in Decimal arithmetic, rounded half-even to 2 decimals (zero rate: unrounded)."""
+    P = Decimal(P)
+    n_months = Decimal(n_months)
+    r = Decimal(annual_rate) / Decimal(12) / Decimal(100)
+    if r == 0:
+        return float(P/ n_months)
+    pow_factor = (1 + r) ** n_months
+    emi = P * r * (pow_factor / (pow_factor - 1))
+    return float(round(emi, 2))
+
+
+def compute_emi(P: float, annual_rate: float, n_months: int) -> float:
+    """
+    EMI in float arithmetic, identical to compute_emi_decimal: results within the tie
+    margin of a half paisa, zero rates and degenerate inputs are handed to the reference.
+    """
+    r = annual_rate / 12.0 / 100.0
+    if r == 0 or n_months <= 0:
+        return compute_emi_decimal(P, annual_rate, n_months)
+    pow_factor = (1.0 + r) ** n_months
+    paise = P * r * (pow_factor / (pow_factor - 1.0)) * 100.0
+    if not math.isfinite(paise):
+        return compute_emi_decimal(P, annual_rate, n_months)
+    whole = math.floor(paise)
+    if abs(paise - whole - 0.5) < _TIE_ABS_TOLERANCE + _TIE_REL_TOLERANCE * abs(paise):
+        return compute_emi_decimal(P, annual_rate, n_months)
+    return round(paise) / 100.0
+
+
+def compute_emi_batch_values(principals, annual_rates, tenures) -> np.ndarray:
+    """Vectorized compute_emi over broadcastable arrays, with the same tie fallback."""
+    P = np.asarray(principals, dtype=np.float64)
+    rate = np.asarray(annual_rates, dtype=np.float64)
+    n = np.asarray(tenures, dtype=np.float64)
+    P, rate, n = np.broadcast_arrays(P, rate, n)
+
+    r = rate / 12.0 / 100.0
+    fallback = (r == 0) | (n <= 0)
+    safe_r = np.where(fallback, 1.0, r)
+    safe_n = np.where(fallback, 1.0, n)
+    pow_factor = np.power(1.0 + safe_r, safe_n)
+    paise = P * safe_r * (pow_factor / (pow_factor - 1.0)) * 100.0
+
+    with np.errstate(invalid="ignore"):
+        on_tie = np.abs(paise - np.floor(paise) - 0.5) < (
+            _TIE_ABS_TOLERANCE + _TIE_REL_TOLERANCE * np.abs(paise)
+        )
+    out = np.round(paise) / 100.0
+
+    for i in np.flatnonzero(fallback | on_tie | ~np.isfinite(out)):
+        out[i] = compute_emi_decimal(float(P[i]), float(rate[i]), int(n[i]))
+    return out
@@ -0,0 +1,131 @@
+# generate_customers.py – write a large, reproducible synthetic customer base into a customer store
+#
+#   python MCPServer/generate_customers.py --count 1000000 --seed 7
+#   python MCPServer/generate_customers.py --count 100000 --store sqlite:///storage/customers.db
+#
+# Customers get ids CUST011, CUST012, ... after the ten demo customers, which the
+# server still seeds on startup. Rows are generated in fixed blocks, each from its own
+# seeded generator, so a given --seed always yields the same customer for the same id
+# regardless of --count. Point MCP_CUSTOMER_STORE at the same URL when starting the server.
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from customer_store import open_customer_repository
+
+# rows per generator block and per upsert_many transaction
+BLOCK = 100_000
+
+# cities with rough weights by urban population
+CITIES = (
+    ("Mumbai", 12), ("Delhi", 12), ("Bengaluru", 10), ("Hyderabad", 8), ("Chennai", 8),
+    ("Kolkata", 8), ("Pune", 7), ("Ahmedabad", 6), ("Surat", 4), ("Jaipur", 4),
+    ("Lucknow", 4), ("Kanpur", 2), ("Nagpur", 2), ("Indore", 2), ("Bhopal", 2),
+    ("Kochi", 2), ("Coimbatore", 2), ("Chandigarh", 2), ("Visakhapatnam", 2), ("Patna", 1),
+)
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Akash", "Ananya", "Arjun", "Asha", "Deepak", "Divya", "Farhan", "Gaurav",
+    "Ishita", "Karan", "Kavya", "Manoj", "Meera", "Neha", "Nikhil", "Nisha", "Pooja", "Pranav",
+    "Priya", "Rahul", "Ravi", "Rohan", "Sana", "Siddharth", "Sneha", "Sourav", "Tanvi", "Vikram",
+)
+LAST_NAMES = (
+    "Agarwal", "Banerjee", "Bose", "Chatterjee", "Desai", "Ghosh", "Gupta", "Iyer", "Jain", "Joshi",
+    "Kapoor", "Khan", "Kumar", "Mehta", "Menon", "Mishra", "Nair", "Patel", "Pillai", "Rao",
+    "Reddy", "Shah", "Sharma", "Singh", "Verma",
+)
+
+# phone numbers are an affine bijection of the id over 9 digits: unique, but not sequential
+_PHONE_MOD = 10 ** 9
+_PHONE_MUL = 387_420_489  # 3**18, coprime with 10**9
+
+
+def generate_block(seed: int, block: int, first_id: int, count: int) -> Dict[str, np.ndarray]:
+    """Column arrays for ids [first_id, first_id + count) inside one generator block."""
+    rng = np.random.default_rng([seed, block])
+    ids = np.arange(first_id, first_id + count)
+
+    city_weights = np.array([w for _, w in CITIES], dtype=float)
+    city = rng.choice(len(CITIES), size=count, p=city_weights / city_weights.sum())
+    first = rng.integers(len(FIRST_NAMES), size=count)
+    last = rng.integers(len(LAST_NAMES), size=count)
+    age = np.clip(np.rint(rng.normal(34, 8, count)), 21, 60).astype(np.int64)
+
+    # log-normal salary, median about 45k a month, rising gently with age
+    salary = rng.lognormal(np.log(45_000), 0.55, count) * (1 + 0.015 * (age - 30))
+    salary = np.clip(np.round(salary, -3), 12_000, 1_000_000).astype(np.int64)
+    score = np.clip(np.rint(rng.normal(715, 55, count)), 300, 900).astype(np.int64)
+    # limit is a salary multiple that grows with the score, rounded to 10k
+    multiple = np.clip(2 + (score - 650) / 30, 0.5, 8)
+    limit = np.round(salary * multiple, -4).astype(np.int64)
+
+    phone = 7_000_000_000 + (ids * _PHONE_MUL + 12_345) % _PHONE_MOD
+    return {
+        "id": ids, "city": city, "first": first, "last": last, "age": age,
+        "salary": salary, "score": score, "limit": limit, "phone": phone,
+    }
+
+
+def block_rows(cols: Dict[str, np.ndarray]) -> Iterator[Dict[str, Any]]:
+    for i, city, first, last, age, salary, score, limit, phone in zip(
+        cols["id"].tolist(), cols["city"].tolist(), cols["first"].tolist(),
+        cols["last"].tolist(), cols["age"].tolist(), cols["salary"].tolist(),
+        cols["score"].tolist(), cols["limit"].tolist(), cols["phone"].tolist(),
+    ):
+        fname, lname = FIRST_NAMES[first], LAST_NAMES[last]
+        yield {
+            "customer_id": f"CUST{i:03d}",
+            "name": f"{fname} {lname}",
+            "age": age,
+            "city": CITIES[city][0],
+            "phone": str(phone),
+            "email": f"{fname.lower()}.{lname.lower()}{i}@example.com",
+            "pre_approved_limit": limit,
+            "salary_monthly": salary,
+            "credit_score": score,
+        }
+
+
+def generate(seed: int, start_id: int, count: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield customers in lists of at most BLOCK rows, aligned to generator blocks."""
+    end = start_id + count
+    cid = start_id
+    while cid < end:
+        block = cid // BLOCK
+        stop = min(end, (block + 1) * BLOCK)
+        cols = generate_block(seed, block, block * BLOCK, BLOCK)
+        offset = cid - block * BLOCK
+        part = {k: v[offset:offset + stop - cid] for k, v in cols.items()}
+        yield list(block_rows(part))
+        cid = stop
+
+
+def main():
+    storage_dir = os.environ.get("MCP_STORAGE_DIR", "./storage")
+    default_store = os.environ.get(
+        "MCP_CUSTOMER_STORE", f"sqlite:///{os.path.join(storage_dir, 'customers.db')}"
+    )
+    parser = argparse.ArgumentParser(description="Write synthetic customers into a customer store")
+    parser.add_argument("--count", type=int, default=100_000, help="customers to generate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start-id", type=int, default=11, help="first numeric customer id")
+    parser.add_argument("--store", default=default_store, help="customer store URL (sqlite:///... )")
+    args = parser.parse_args()
+
+    repo = open_customer_repository(args.store)
+    written = 0
+    started = time.perf_counter()
+    for rows in generate(args.seed, args.start_id, args.count):
+        written += repo.upsert_many(rows)
+        elapsed = time.perf_counter() - started
+        print(f"\r{written}/{args.count} customers ({written / elapsed:,.0f}/s)", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    print(f"wrote {written} customers to {args.store} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# idempotency.py – replay results of side-effecting tools called again with the same idempotency_key
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from pydantic import BaseModel
+
+from cache import TTLCache
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency_key is reused with different arguments."""
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"not part of an idempotency fingerprint: {type(value).__name__}")
+
+
+class IdempotencyCache:
+    """
+    Keeps the result of each successful call made with an idempotency_key, keyed on
+    (tool, key), in a size-bounded TTL cache. A repeat call with the same key and the
+    same arguments gets the stored result without running the tool again; a repeat
+    that arrives while the first call is still running waits for it. Failed calls are
+    not stored, so retrying after an error runs the tool again.
+
+    Results live in this process only: with several server workers a retry routed to
+    another worker runs the tool again (content-addressed storage still dedupes the file).
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.results = TTLCache("idempotency", maxsize, ttl)
+        self._in_flight: Dict[Hashable, Tuple[str, asyncio.Future]] = {}
+
+    @staticmethod
+    def fingerprint(arguments: Dict[str, Any]) -> str:
+        encoded = json.dumps(arguments, sort_keys=True, default=_jsonable, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    async def run(self, tool: str, key: str, arguments: Dict[str, Any], call: Callable) -> Any:
+        fingerprint = self.fingerprint(arguments)
+        cache_key = (tool, key)
+
+        stored = self.results.get(cache_key)
+        if stored is not None:
+            if stored[0] != fingerprint:
+                raise IdempotencyConflict(f"idempotency_key {key!r} was already used with different arguments")
+            return stored[1]
+
+        running = self._in_flight.get(cache_key)
+        if running is not None:
+            if running[0] != fingerprint:
+                raise IdempotencyConflict(f"idempotency_key {key!r} was already used with different arguments")
+            return await asyncio.shield(running[1])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[cache_key] = (fingerprint, future)
+        try:
+            result = await call()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved: nobody may be waiting on it
+            raise
+        else:
+            self.results.put(cache_key, (fingerprint, result))
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[cache_key]
+
+    def idempotent(self, fn: Callable) -> Callable:
+        """
+        Wrap an async tool that takes an `idempotency_key` parameter. Calls without a key
+        run as before. Context arguments (ctx) are not part of the fingerprint.
+        """
+        signature = inspect.signature(fn)
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = kwargs.get("idempotency_key")
+            if not key:
+                return await fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                k: v for k, v in bound.arguments.items()
+                if k not in ("idempotency_key", "ctx")
+            }
+            return await self.run(name, key, arguments, lambda: fn(*args, **kwargs))
+
+        return wrapper
@@ -0,0 +1,164 @@
+# metrics.py – per-tool call counts, errors, in-flight gauges and latency histograms
+
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+# latency bucket upper bounds in seconds (Prometheus "le" labels); +Inf is implicit
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ToolStats:
+    __slots__ = ("calls", "errors", "in_flight", "buckets", "total_seconds", "max_seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (the last finite bound if beyond it)."""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_seconds
+
+
+class MetricsRegistry:
+    """
+    Counters live in this process only. Under serve_http.py each uvicorn worker keeps
+    its own registry, so a scrape of /metrics sees whichever worker answered it.
+    """
+
+    def __init__(self) -> None:
+        self._tools: Dict[str, ToolStats] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _stats(self, name: str) -> ToolStats:
+        stats = self._tools.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._tools.setdefault(name, ToolStats())
+        return stats
+
+    def _enter(self, name: str) -> None:
+        stats = self._stats(name)
+        with self._lock:
+            stats.in_flight += 1
+
+    def _exit(self, name: str, elapsed: float, failed: bool) -> None:
+        stats = self._stats(name)
+        i = 0
+        while i < len(LATENCY_BUCKETS) and elapsed > LATENCY_BUCKETS[i]:
+            i += 1
+        with self._lock:
+            stats.in_flight -= 1
+            stats.calls += 1
+            stats.errors += failed
+            stats.buckets[i] += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    def instrument(self, fn: Callable) -> Callable:
+        """
+        Wrap a tool function. Put it below @mcp.tool() so FastMCP still sees the
+        original name, docstring, signature and sync/async kind.
+        """
+        name = fn.__name__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                self._enter(name)
+                start = time.perf_counter()
+                failed = True
+                try:
+                    result = await fn(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    self._exit(name, time.perf_counter() - start, failed)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            self._enter(name)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self._exit(name, time.perf_counter() - start, failed)
+
+        return wrapper
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(s.in_flight for s in self._tools.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for name, s in sorted(self._tools.items()):
+                tools[name] = {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "in_flight": s.in_flight,
+                    "mean_ms": round(1000 * s.total_seconds / s.calls, 3) if s.calls else 0.0,
+                    "p50_ms": 1000 * s.quantile(0.50),
+                    "p95_ms": 1000 * s.quantile(0.95),
+                    "p99_ms": 1000 * s.quantile(0.99),
+                    "max_ms": round(1000 * s.max_seconds, 3),
+                    "total_seconds": round(s.total_seconds, 6),
+                }
+        return {"uptime_seconds": round(time.time() - self.started_at, 3), "tools": tools}
+
+    def render_prometheus(self, gauges: Dict[str, Tuple[str, float]] = None) -> str:
+        """Prometheus text exposition format; `gauges` maps extra metric names to (help, value)."""
+        lines: List[str] = []
+
+        def family(metric: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+
+        with self._lock:
+            tools = sorted(self._tools.items())
+
+            family("mcp_tool_calls_total", "counter", "Completed tool calls.")
+            for name, s in tools:
+                lines.append(f'mcp_tool_calls_total{{tool="{name}"}} {s.calls}')
+            family("mcp_tool_errors_total", "counter", "Tool calls that raised.")
+            for name, s in tools:
+                lines.append(f'mcp_tool_errors_total{{tool="{name}"}} {s.errors}')
+            family("mcp_tool_in_flight", "gauge", "Tool calls currently executing.")
+            for name, s in tools:
+                lines.append(f'mcp_tool_in_flight{{tool="{name}"}} {s.in_flight}')
+
+            family("mcp_tool_duration_seconds", "histogram", "Tool call latency.")
+            for name, s in tools:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, s.buckets):
+                    cumulative += count
+                    lines.append(f'mcp_tool_duration_seconds_bucket{{tool="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'mcp_tool_duration_seconds_bucket{{tool="{name}",le="+Inf"}} {s.calls}')
+                lines.append(f'mcp_tool_duration_seconds_sum{{tool="{name}"}} {s.total_seconds:.6f}')
+                lines.append(f'mcp_tool_duration_seconds_count{{tool="{name}"}} {s.calls}')
+
+        for metric, (help_text, value) in (gauges or {}).items():
+            family(metric, "gauge", help_text)
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
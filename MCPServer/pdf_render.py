@@ -0,0 +1,242 @@
+# pdf_render.py – sanction letter rendering, run in a pool of worker processes
+
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+LETTER_FONTS = ("Helvetica", "Helvetica-Bold")
+
+
+class RenderQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is at capacity."""
+
+
+class RenderWorkerLost(Exception):
+    """Raised when a render worker died and the letter failed again on a fresh pool."""
+
+
+# (font, size, x, y, text) for every line on the letter; {field} marks per-customer values
+LETTER_LAYOUT = (
+    ("Helvetica-Bold", 14, 50, 800, "Sanction Letter"),
+    ("Helvetica", 11, 50, 770, "Date: {date}"),
+    ("Helvetica", 11, 50, 750, "Customer: {name} (ID: {customer_id})"),
+    ("Helvetica", 11, 50, 730, "Approved Amount: INR {amount}"),
+    ("Helvetica", 11, 50, 710, "Tenure: {tenure_months} months"),
+    ("Helvetica", 11, 50, 690, "Interest Rate (annual): {interest_rate}%"),
+    ("Helvetica", 11, 50, 660, "This is a demo sanction letter generated by MCP server."),
+)
+LETTER_FIELDS = ("date", "name", "customer_id", "amount", "tenure_months", "interest_rate")
+
+
+def _draw_letter(c: canvas.Canvas, fields: Dict[str, Any]) -> None:
+    for font, size, x, y, text in LETTER_LAYOUT:
+        c.setFont(font, size)
+        c.drawString(x, y, text.format(**fields))
+    c.save()
+
+
+def render_sanction_letter_cold(fields: Dict[str, Any]) -> bytes:
+    """Draw one sanction letter from scratch with reportlab."""
+    buf = io.BytesIO()
+    _draw_letter(canvas.Canvas(buf), fields)
+    return buf.getvalue()
+
+
+def _pdf_escape(value: Any) -> bytes:
+    text = str(value).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode("cp1252", errors="replace")
+
+
+class LetterTemplate:
+    """
+    The sanction letter rendered once by reportlab with placeholders in place of the
+    customer fields. Fonts, page tree, catalog and boilerplate text are kept as ready
+    bytes; a letter only substitutes the fields into the content stream and rewrites
+    the stream length, xref offsets and document ID.
+
+    reportlab's invariant mode stamps 2000-01-01 as CreationDate and ModDate; each
+    letter gets its own date there instead, at day resolution so identical letters
+    issued the same day still come out byte-identical (and are stored once).
+    """
+
+    _OBJ = re.compile(rb"(\d+) 0 obj\n(.*?)endobj\n", re.DOTALL)
+    _STREAM = re.compile(rb"stream\n(.*)endstream\n", re.DOTALL)
+    _PLACEHOLDER = re.compile(rb"@@(\w+)@@")
+    _ID = re.compile(rb"/ID \n?\[<[0-9a-f]+><[0-9a-f]+>\]")
+    _INVARIANT_DATE = b"(D:20000101000000+00'00')"
+
+    def __init__(self) -> None:
+        buf = io.BytesIO()
+        _draw_letter(
+            canvas.Canvas(buf, invariant=1, pageCompression=0),
+            {f: f"@@{f}@@" for f in LETTER_FIELDS},
+        )
+        pdf = buf.getvalue()
+
+        objects = list(self._OBJ.finditer(pdf))
+        self._header = pdf[:objects[0].start()]
+        self._objects: List[Optional[bytes]] = []  # None marks the content stream
+        for m in objects:
+            stream = self._STREAM.search(m.group(2))
+            if stream:
+                self._content_number = int(m.group(1))
+                self._content_parts = self._PLACEHOLDER.split(stream.group(1))
+                self._objects.append(None)
+            else:
+                self._objects.append(m.group(0))
+        self._dated = {i for i, body in enumerate(self._objects) if body and self._INVARIANT_DATE in body}
+        trailer = pdf[pdf.index(b"trailer"):pdf.index(b"startxref")]
+        self._trailer_head, self._trailer_tail = self._ID.split(trailer)
+
+    def render(self, fields: Dict[str, Any]) -> bytes:
+        parts = self._content_parts
+        data = b"".join(
+            part if i % 2 == 0 else _pdf_escape(fields[part.decode()])
+            for i, part in enumerate(parts)
+        )
+        content = b"%d 0 obj\n<<\n/Length %d\n>>\nstream\n%sendstream\nendobj\n" % (
+            self._content_number, len(data), data,
+        )
+
+        day = re.sub(r"\D", "", str(fields["date"]))
+        pdf_date = b"(D:%s000000+00'00')" % day.encode() if len(day) == 8 else self._INVARIANT_DATE
+
+        out = [self._header]
+        offset = len(self._header)
+        xref = [b"0000000000 65535 f \n"]
+        for i, body in enumerate(self._objects):
+            if body is None:
+                body = content
+            elif i in self._dated:
+                body = body.replace(self._INVARIANT_DATE, pdf_date)
+            xref.append(b"%010d 00000 n \n" % offset)
+            out.append(body)
+            offset += len(body)
+
+        doc_id = hashlib.md5(data).hexdigest().encode()
+        out.append(b"xref\n0 %d\n" % len(xref))
+        out.extend(xref)
+        out.append(self._trailer_head)
+        out.append(b"/ID \n[<%s><%s>]" % (doc_id, doc_id))
+        out.append(self._trailer_tail)
+        out.append(b"startxref\n%d\n%%%%EOF\n" % offset)
+        return b"".join(out)
+
+
+_template: Optional[LetterTemplate] = None
+
+
+def render_sanction_letter(fields: Dict[str, Any]) -> bytes:
+    """Stamp one sanction letter onto the cached template. Runs inside a pool worker."""
+    global _template
+    if _template is None:
+        _template = LetterTemplate()
+    return _template.render(fields)
+
+
+def _warm_worker() -> None:
+    # load font metrics and build the letter template before the first real letter
+    global _template
+    for font in LETTER_FONTS:
+        pdfmetrics.getFont(font)
+    _template = LetterTemplate()
+
+
+def _ping() -> bool:
+    return True
+
+
+class RenderPool:
+    """
+    Process pool for PDF rendering with a bounded wait queue. At most `workers` letters
+    render at once, at most `queue_size` more wait for a worker, and anything beyond
+    that is rejected with RenderQueueFull so callers can back off.
+
+    A worker that dies (OOM kill, crash) breaks the whole executor; the pool is then
+    replaced and the letter retried once on the new one before RenderWorkerLost.
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.restarts = 0
+        self.broken = False  # the last render failed even on a freshly started pool
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # the server process already runs threads (audit writer, retention, I/O
+                # pool) and forking it can deadlock a child on a lock one of them held;
+                # workers fork from a clean forkserver that has only imported this module
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_warm_worker, mp_context=context
+                )
+            return self._executor
+
+    def _replace(self, executor: ProcessPoolExecutor) -> None:
+        # every letter in flight on a broken executor fails at once; only the first to
+        # get here shuts it down, the rest retry on the pool that replaced it
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+
+    def warm(self) -> None:
+        """Start every worker now (each runs the font warm-up) instead of on first use."""
+        pool = self._pool()
+        for f in [pool.submit(_ping) for _ in range(self.workers)]:
+            f.result()
+
+    @property
+    def in_flight(self) -> int:
+        return min(self._pending, self.workers)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.workers)
+
+    async def render(self, fields: Dict[str, Any]) -> bytes:
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                raise RenderQueueFull(
+                    f"{self._pending} letters already rendering or queued"
+                )
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            for attempt in (1, 2):
+                pool = self._pool()
+                try:
+                    pdf = await loop.run_in_executor(pool, render_sanction_letter, fields)
+                except BrokenProcessPool as e:
+                    self._replace(pool)
+                    if attempt == 2:
+                        self.broken = True
+                        raise RenderWorkerLost(f"render worker died twice: {e}") from e
+                else:
+                    self.broken = False
+                    return pdf
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,209 @@
+# policy.py – declarative, hot-reloadable underwriting decision table
+
+import json
+import logging
+import operator
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# inputs a rule may compare; "emi" is only computed when a matched rule needs it
+POLICY_INPUTS = (
+    "score",
+    "pre_limit",
+    "requested",
+    "salary",
+    "has_salary_evidence",
+    "tenure_months",
+    "annual_rate",
+    "emi",
+)
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class PolicyError(ValueError):
+    """Raised when a policy file is malformed or names an unknown input or operator."""
+
+
+class Condition:
+    """`left op value` or `left op scale * right`; works on scalars and NumPy arrays alike."""
+
+    __slots__ = ("left", "op", "right", "scale", "value")
+
+    def __init__(self, spec: Mapping[str, Any]) -> None:
+        self.left = spec.get("left")
+        self.op = _OPS.get(spec.get("op"))
+        self.right = spec.get("right")
+        self.scale = spec.get("scale", 1)
+        self.value = spec.get("value")
+        if self.left not in POLICY_INPUTS:
+            raise PolicyError(f"unknown policy input: {self.left!r}")
+        if self.op is None:
+            raise PolicyError(f"unknown operator: {spec.get('op')!r}")
+        if self.right is not None and self.right not in POLICY_INPUTS:
+            raise PolicyError(f"unknown policy input: {self.right!r}")
+        if (self.right is None) == ("value" not in spec):
+            raise PolicyError(f"condition on {self.left!r} needs exactly one of right/value")
+
+    def inputs(self) -> Tuple[str, ...]:
+        return (self.left,) if self.right is None else (self.left, self.right)
+
+    def __call__(self, env: Mapping[str, Any]) -> Any:
+        if self.right is None:
+            return self.op(env[self.left], self.value)
+        return self.op(env[self.left], self.scale * env[self.right])
+
+
+class Rule:
+    __slots__ = ("conditions", "decision", "reason", "with_emi")
+
+    def __init__(self, spec: Mapping[str, Any]) -> None:
+        try:
+            self.conditions = [Condition(c) for c in spec.get("when", [])]
+            self.decision = str(spec["decision"])
+            self.reason = str(spec["reason"])
+        except (KeyError, TypeError, AttributeError) as e:
+            raise PolicyError(f"malformed rule {spec!r}: {e}")
+        self.with_emi = bool(spec.get("emi", False))
+
+
+class _LazyInputs(dict):
+    """Scalar inputs; values given as callables are computed on first use."""
+
+    def __init__(self, values: Mapping[str, Any], lazy: Mapping[str, Callable[[], Any]]) -> None:
+        super().__init__(values)
+        self._lazy = lazy
+
+    def __missing__(self, key: str) -> Any:
+        if key not in self._lazy:
+            raise KeyError(key)
+        value = self[key] = self._lazy[key]()
+        return value
+
+
+class DecisionTable:
+    """
+    A compiled policy: an ordered list of rules plus a default. The first rule whose
+    conditions all hold decides. decide() evaluates one application and stops at the
+    first match; decide_batch() evaluates every rule as a NumPy mask over all
+    applications and picks the first match per row with np.select.
+    """
+
+    def __init__(self, spec: Mapping[str, Any], source: str = "") -> None:
+        if not isinstance(spec, Mapping) or "version" not in spec:
+            raise PolicyError("policy must be an object with a version")
+        self.version = str(spec["version"])
+        self.source = source
+        rules = spec.get("rules")
+        if not isinstance(rules, list):
+            raise PolicyError("policy rules must be a list")
+        self.rules = [Rule(r) for r in rules]
+        self.default = Rule({"when": [], **spec.get("default", {})})
+
+    @classmethod
+    def load(cls, path: str) -> "DecisionTable":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                spec = json.load(f)
+        except json.JSONDecodeError as e:
+            raise PolicyError(f"{path}: {e}")
+        return cls(spec, source=path)
+
+    def decide(
+        self,
+        inputs: Mapping[str, Any],
+        lazy: Optional[Mapping[str, Callable[[], Any]]] = None,
+    ) -> Dict[str, Any]:
+        """Decision for one application. Returns decision, reason and emi (None when not needed)."""
+        env = _LazyInputs(inputs, lazy or {})
+        rule = next(
+            (r for r in self.rules if all(c(env) for c in r.conditions)), self.default
+        )
+        return {
+            "decision": rule.decision,
+            "reason": rule.reason,
+            "emi": env["emi"] if rule.with_emi else None,
+        }
+
+    def decide_batch(self, inputs: Mapping[str, np.ndarray]) -> Tuple[np.ndarray, List[Rule]]:
+        """
+        Index of the deciding rule per row (len(rules) means the default), plus the
+        rule list to index into. Every input must be an array of the same length.
+        """
+        n = len(next(iter(inputs.values())))
+        masks = []
+        for rule in self.rules:
+            mask = np.ones(n, dtype=bool)
+            for c in rule.conditions:
+                mask &= np.asarray(c(inputs), dtype=bool)
+            masks.append(mask)
+        chosen = np.select(masks, np.arange(len(self.rules)), default=len(self.rules))
+        return chosen, self.rules + [self.default]
+
+
+class PolicyStore:
+    """
+    Holds the current DecisionTable for a policy file and reloads it when the file's
+    mtime changes, checked at most once per check_interval seconds. A file that fails
+    to load leaves the previous table in force.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._table = DecisionTable.load(path)
+        self._mtime = os.stat(path).st_mtime_ns
+        self._checked_at = time.monotonic()
+        self.loaded_at = time.time()
+        self.last_error: Optional[str] = None
+
+    @property
+    def table(self) -> DecisionTable:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self.reload_if_changed(now)
+        return self._table
+
+    def reload_if_changed(self, now: Optional[float] = None) -> bool:
+        with self._lock:
+            self._checked_at = time.monotonic() if now is None else now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                self.last_error = f"policy file missing: {self.path}"
+                return False
+            if mtime == self._mtime:
+                return False
+            try:
+                self._table = DecisionTable.load(self.path)
+                self.last_error = None
+                self.loaded_at = time.time()
+            except (OSError, PolicyError) as e:
+                self.last_error = str(e)
+                logger.warning("underwriting policy reload failed, keeping %s: %s", self._table.version, e)
+            self._mtime = mtime
+            return self.last_error is None
+
+    def info(self) -> Dict[str, Any]:
+        table = self.table
+        return {
+            "version": table.version,
+            "path": self.path,
+            "rules": len(table.rules),
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+        }
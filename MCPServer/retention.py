@@ -0,0 +1,142 @@
+# retention.py – TTLs, storage quota and background garbage collection for STORAGE_DIR
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from blob_store import LEGACY_NAME, BlobStore
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 3600
+
+
+class RetentionSweeper:
+    """
+    Runs small sweeps on a background thread; no sweep touches more than batch_size items
+    of any one kind, so a full STORAGE_DIR is never walked in one pass.
+
+    Blob kinds ("salary", "sanction", ...) have a TTL measured from their last access.
+    An expired blob loses its references; unreferenced blobs are then deleted in
+    least-recently-used order while the store is over quota_bytes (or straight away
+    when no quota is set). Rotated audit segments and abandoned chunked uploads are
+    deleted once older than the "audit" and "upload" TTLs.
+
+    Documents written before the blob store existed (salary_/sanction_<customer>_<uuid>.pdf
+    flat in legacy_dir) are deleted once their mtime is older than their kind's TTL; they
+    have no index, so their age is counted from when they were written.
+    """
+
+    def __init__(
+        self,
+        blobs: BlobStore,
+        audit_segment_dir: str,
+        uploads_dir: str,
+        ttl_seconds: Dict[str, float],
+        legacy_dir: Optional[str] = None,
+        quota_bytes: int = 0,
+        batch_size: int = 200,
+        interval: float = 60.0,
+    ) -> None:
+        self.blobs = blobs
+        self.audit_segment_dir = audit_segment_dir
+        self.uploads_dir = uploads_dir
+        self.legacy_dir = legacy_dir
+        self.ttl_seconds = {k: v for k, v in ttl_seconds.items() if v > 0}
+        self.quota_bytes = quota_bytes
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cursors: Dict[str, Iterator[os.DirEntry]] = {}
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep_once()
+            except Exception as e:
+                logger.exception("retention sweep failed: %s", e)
+
+    def sweep_once(self) -> Dict[str, int]:
+        now = time.time()
+        stats = {"expired": 0, "evicted": 0, "audit_segments": 0, "uploads": 0, "legacy_documents": 0}
+
+        for kind, ttl in self.ttl_seconds.items():
+            if kind not in ("audit", "upload"):
+                stats["expired"] += self.blobs.expire(kind, now - ttl, self.batch_size)
+
+        for digest, ext in self.blobs.least_recently_used_unreferenced(self.batch_size):
+            if self.quota_bytes and self.blobs.total_bytes() <= self.quota_bytes:
+                break
+            if self.blobs.remove_unreferenced(digest, ext):
+                stats["evicted"] += 1
+
+        if "audit" in self.ttl_seconds:
+            cutoff = now - self.ttl_seconds["audit"]
+            stats["audit_segments"] = self._sweep_dir(
+                self.audit_segment_dir, lambda e: [e.path] if e.stat().st_mtime < cutoff else []
+            )
+        if "upload" in self.ttl_seconds:
+            cutoff = now - self.ttl_seconds["upload"]
+            stats["uploads"] = self._sweep_dir(
+                self.uploads_dir, lambda e: self._upload_files(e, cutoff)
+            )
+        if self.legacy_dir and ({"salary", "sanction"} & self.ttl_seconds.keys()):
+            stats["legacy_documents"] = self._sweep_dir(
+                self.legacy_dir, lambda e: self._legacy_files(e, now)
+            )
+        return stats
+
+    def _sweep_dir(self, path: str, files_for) -> int:
+        # resume the directory listing where the previous sweep stopped
+        entries = self._cursors.get(path)
+        if entries is None:
+            try:
+                entries = self._cursors[path] = os.scandir(path)
+            except FileNotFoundError:
+                return 0
+
+        removed = 0
+        seen = 0
+        for entry in entries:
+            seen += 1
+            try:
+                if entry.is_file():
+                    for f in files_for(entry):
+                        os.remove(f)
+                        removed += 1
+            except FileNotFoundError:
+                pass
+            if seen >= self.batch_size:
+                break
+        else:
+            entries.close()
+            del self._cursors[path]
+        return removed
+
+    @staticmethod
+    def _upload_files(entry: os.DirEntry, older_than: float) -> List[str]:
+        # an upload is a .part file plus its .json sidecar; the .part mtime is its last chunk
+        if not entry.name.endswith(".part") or entry.stat().st_mtime >= older_than:
+            return []
+        return [entry.path, entry.path[:-len(".part")] + ".json"]
+
+    def _legacy_files(self, entry: os.DirEntry, now: float) -> List[str]:
+        m = LEGACY_NAME.match(entry.name)
+        ttl = self.ttl_seconds.get(m.group(1)) if m else None
+        if ttl is None or entry.stat().st_mtime >= now - ttl:
+            return []
+        return [entry.path]
@@ -0,0 +1,54 @@
+# serve_http.py – run the NBFC MCP server as several worker processes behind one port
+#
+#   MCP_WORKERS=8 python MCPServer/serve_http.py
+#
+# Every worker serves streamable HTTP at http://MCP_HOST:MCP_PORT/mcp. Workers share
+# STORAGE_DIR (SQLite stores, blobs, uploads), so tool calls can land on any of them.
+# Legacy SSE sessions are pinned to the process that holds the stream: with one worker
+# they are served on the same port, with more a single extra SSE process listens on
+# MCP_SSE_PORT for clients that have not migrated yet.
+
+import os
+import subprocess
+import sys
+
+import uvicorn
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    workers = int(os.environ.get("MCP_WORKERS", str(os.cpu_count() or 1)))
+    host = os.environ.get("MCP_HOST", "127.0.0.1")
+    port = int(os.environ.get("MCP_PORT", "8000"))
+    sse_port = os.environ.get("MCP_SSE_PORT", "8001")
+
+    # one PDF process per worker unless configured, and one audit file per process
+    os.environ.setdefault("MCP_PDF_WORKERS", "1")
+    os.environ["MCP_AUDIT_PER_PROCESS"] = "1"
+    os.environ["MCP_HTTP_SSE"] = "1" if workers == 1 else "0"
+
+    legacy_sse = None
+    if workers > 1 and sse_port:
+        legacy_sse = subprocess.Popen(
+            [sys.executable, os.path.join(SERVER_DIR, "server.py")],
+            env={**os.environ, "MCP_TRANSPORT": "sse", "MCP_PORT": sse_port},
+        )
+        print(f"legacy SSE endpoint on http://{host}:{sse_port}/sse")
+
+    try:
+        uvicorn.run(
+            "server:create_http_app",
+            factory=True,
+            host=host,
+            port=port,
+            workers=workers,
+        )
+    finally:
+        if legacy_sse is not None:
+            legacy_sse.terminate()
+            legacy_sse.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,72 @@
 # server.py  – NBFC MCP server using FastMCP (Python MCP SDK)
 
 import os
+import sys
 import json
-import uuid
+import logging
+import atexit
+import asyncio
+import functools
 import base64
-from typing import Any, Dict, Optional
+import shutil
+import hashlib
+import time
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from importlib.machinery import ModuleSpec
+from typing import Any, Dict, List, Optional, Tuple
 
 from datetime import datetime
 
-from mcp.server.fastmcp import FastMCP
+import numpy as np
+import uvicorn
+from pydantic import BaseModel, Field
+
+from mcp.server.fastmcp import Context, FastMCP
 from fastmcp.exceptions import ToolError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+from customer_store import open_customer_repository
+from audit_writer import AuditQueueFull, AuditWriter, rotate_orphaned_logs
+from pdf_render import RenderPool, RenderQueueFull, RenderWorkerLost
+from blob_store import BLOB_NAME, LEGACY_NAME, BlobStore
+from uploads import UploadError, UploadSessions
+from retention import DAY, RetentionSweeper
+from cache import TTLCache
+from idempotency import IdempotencyCache
+from metrics import MetricsRegistry
+from policy import PolicyStore
+from emi import compute_emi, compute_emi_batch_values
+from compression import compress_segment, get_codec
 
-from decimal import Decimal, getcontext
+logger = logging.getLogger(__name__)
 
 STORAGE_DIR = os.environ.get("MCP_STORAGE_DIR", "./storage")
 os.makedirs(STORAGE_DIR, exist_ok=True)
 
 # Create MCP server instance
-mcp = FastMCP("NBFC MCP Server", json_response=True)
+# Tool handlers keep no per-session state (everything lives in STORAGE_DIR), so
+# streamable HTTP runs stateless and any worker process can serve any request.
+# Responses are SSE streams rather than plain JSON bodies so that notifications a
+# tool sends while it runs (per-letter progress from generate_sanction_letters_batch)
+# reach the client on the response to its own request.
+mcp = FastMCP(
+    "NBFC MCP Server",
+    json_response=False,
+    stateless_http=True,
+    host=os.environ.get("MCP_HOST", "127.0.0.1"),
+    port=int(os.environ.get("MCP_PORT", "8000")),
+)
+
+# --- Metrics: every tool below is wrapped to record calls, errors, in-flight and latency
+tool_metrics = MetricsRegistry()
 
 # --- Mock data: 10 synthetic customers (same as before)
-# THIS CONTAINS THE CUSTOMER INFO
-CUSTOMERS: Dict[str, Dict[str, Any]] = {
+# Seeded into the customer store whenever they are missing (e.g. a freshly generated store)
+SEED_CUSTOMERS: Dict[str, Dict[str, Any]] = {
     "CUST001": {"customer_id":"CUST001","name":"Asha Verma","age":32,"city":"Pune","phone":"9810000001","email":"asha@example.com","pre_approved_limit":300000,"salary_monthly":60000,"credit_score":745},
     "CUST002": {"customer_id":"CUST002","name":"Rahul Sharma","age":29,"city":"Delhi","phone":"9810000002","email":"rahul@example.com","pre_approved_limit":200000,"salary_monthly":45000,"credit_score":712},
     "CUST003": {"customer_id":"CUST003","name":"Sneha Iyer","age":35,"city":"Bengaluru","phone":"9810000003","email":"sneha@example.com","pre_approved_limit":400000,"salary_monthly":85000,"credit_score":780},
@@ -34,36 +79,275 @@ CUSTOMERS: Dict[str, Dict[str, Any]] = {
     "CUST010": {"customer_id":"CUST010","name":"Sourav Ghosh","age":36,"city":"Kolkata","phone":"9810000010","email":"sourav@example.com","pre_approved_limit":500000,"salary_monthly":90000,"credit_score":790},
 }
 
-# --- Helper: EMI calculation (same math as before)
-def compute_emi(P: float, annual_rate: float, n_months: int) -> float:
-    P = Decimal(P)
-    n_months = Decimal(n_months)
-    r = Decimal(annual_rate) / Decimal(12) / Decimal(100)
+# --- Customer store: every tool reads customers through this repository
+CUSTOMER_STORE_URL = os.environ.get(
+    "MCP_CUSTOMER_STORE", f"sqlite:///{os.path.join(STORAGE_DIR, 'customers.db')}"
+)
+customers = open_customer_repository(CUSTOMER_STORE_URL)
+_missing_seed = SEED_CUSTOMERS.keys() - customers.get_many(SEED_CUSTOMERS).keys()
+if _missing_seed:
+    customers.upsert_many(SEED_CUSTOMERS[cid] for cid in sorted(_missing_seed))
+
+# --- Read-through caches in front of the customer store
+# Profile rows and credit scores are cached separately because bureau scores go
+# stale much faster than names and limits. Each tool can ask for fresher profile
+# data than the cache TTL; override with MCP_CACHE_TTL_<TOOL_NAME> (seconds).
+CACHE_MAX_ENTRIES = int(os.environ.get("MCP_CACHE_MAX_ENTRIES", "100000"))
+profile_cache = TTLCache(
+    "customer_profile", CACHE_MAX_ENTRIES,
+    ttl=float(os.environ.get("MCP_CACHE_PROFILE_TTL_SECONDS", "300")),
+)
+credit_score_cache = TTLCache(
+    "credit_score", CACHE_MAX_ENTRIES,
+    ttl=float(os.environ.get("MCP_CACHE_CREDIT_SCORE_TTL_SECONDS", "60")),
+)
+PROFILE_MAX_AGE = {
+    tool: float(os.environ.get(f"MCP_CACHE_TTL_{tool.upper()}", default))
+    for tool, default in {
+        "get_customer_info": "300",
+        "verify_kyc": "60",
+        "prequalify": "60",
+        "underwrite_loan": "30",
+        "generate_sanction_letter": "30",
+    }.items()
+}
+
+# Side-effecting tools take an optional idempotency_key; a retry with the same key and
+# arguments gets the first call's result back instead of rendering or writing again.
+idempotency = IdempotencyCache(
+    maxsize=int(os.environ.get("MCP_IDEMPOTENCY_MAX_ENTRIES", "10000")),
+    ttl=float(os.environ.get("MCP_IDEMPOTENCY_TTL_SECONDS", "3600")),
+)
+
+
+def invalidate_customer(customer_id: Optional[str] = None) -> None:
+    """Drop cached profile and credit score for one customer, or for everyone."""
+    profile_cache.invalidate(customer_id)
+    credit_score_cache.invalidate(customer_id)
+
+
+customers.add_change_listener(lambda ids: [invalidate_customer(cid) for cid in ids])
+
+
+def load_profile(customer_id: str) -> Optional[Dict[str, Any]]:
+    # the score is left out of cached profiles so it is only ever served from
+    # credit_score_cache, on its own (shorter) TTL
+    cust = customers.get(customer_id)
+    if cust:
+        cust = {k: v for k, v in cust.items() if k != "credit_score"}
+    return cust
+
+
+def lookup_customer(customer_id: str, tool: str) -> Dict[str, Any]:
+    """Cached profile row, without credit_score."""
+    cust = profile_cache.get_or_load(customer_id, load_profile, max_age=PROFILE_MAX_AGE[tool])
+    if not cust:
+        raise ToolError(f"customer not found: {customer_id}")
+    return cust
+
+
+def lookup_credit_score(customer_id: str) -> Optional[int]:
+    return credit_score_cache.get_or_load(
+        customer_id, lambda cid: (customers.get(cid) or {}).get("credit_score")
+    )
+
+
+def lookup_customer_with_score(customer_id: str, tool: str) -> Dict[str, Any]:
+    """Full customer row: the cached profile with the credit score from its own cache."""
+    cust = lookup_customer(customer_id, tool)
+    return {**cust, "credit_score": lookup_credit_score(customer_id)}
+
+# --- Document storage: uploads and letters are stored once per distinct content
+# compressible documents are stored compressed; codec "none" turns it off
+_level = os.environ.get("MCP_STORAGE_COMPRESSION_LEVEL")
+STORAGE_CODEC = get_codec(
+    os.environ.get("MCP_STORAGE_COMPRESSION", "gzip"), int(_level) if _level else None
+)
+blobs = BlobStore(
+    os.path.join(STORAGE_DIR, "blobs"),
+    codec=STORAGE_CODEC,
+    durability=os.environ.get("MCP_STORAGE_DURABILITY", "file"),
+)
+
+# --- Storage I/O: document decoding, hashing, compression and writes run on this pool,
+# never on the event loop, and sized separately from the default to_thread executor
+io_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MCP_IO_WORKERS", "4")), thread_name_prefix="storage-io"
+)
+atexit.register(io_pool.shutdown)
+
+
+async def run_io(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(io_pool, functools.partial(fn, *args))
+
+uploads = UploadSessions(
+    os.path.join(STORAGE_DIR, "uploads"),
+    blobs,
+    max_chunk_bytes=int(os.environ.get("MCP_UPLOAD_MAX_CHUNK_BYTES", str(1024 * 1024))),
+)
+
+# --- Audit log: log_event only enqueues, a background thread group-commits to disk
+# with several worker processes each one appends to and rotates its own file
+AUDIT_LOG_NAME = (
+    f"mcp_audit.{os.getpid()}.log"
+    if os.environ.get("MCP_AUDIT_PER_PROCESS") == "1"
+    else "mcp_audit.log"
+)
+# rotated segments are compressed on a side thread so group commits never wait on it
+AUDIT_CODEC = get_codec(
+    os.environ.get("MCP_AUDIT_COMPRESSION", STORAGE_CODEC.name if STORAGE_CODEC else "none"),
+    int(_level) if _level else None,
+)
+audit_compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit-compress")
+atexit.register(audit_compressor.shutdown)
+
+
+def compress_audit_segment(segment: str) -> None:
+    try:
+        compress_segment(segment, AUDIT_CODEC)
+    except Exception as e:
+        logger.error("audit segment compression failed for %s: %s", segment, e)
+
+
+AUDIT_SEGMENT_DIR = os.path.join(STORAGE_DIR, "audit")
+_on_audit_rotate = (
+    (lambda segment: audit_compressor.submit(compress_audit_segment, segment))
+    if AUDIT_CODEC else None
+)
+# per-process files left by workers that have exited (e.g. before a restart) are
+# rotated here, since only the writer that owns a file ever rotates it
+rotate_orphaned_logs(STORAGE_DIR, AUDIT_SEGMENT_DIR, _on_audit_rotate)
+audit_writer = AuditWriter(
+    os.path.join(STORAGE_DIR, AUDIT_LOG_NAME),
+    segment_dir=AUDIT_SEGMENT_DIR,
+    fsync=os.environ.get("MCP_AUDIT_FSYNC", "batch"),
+    queue_size=int(os.environ.get("MCP_AUDIT_QUEUE_SIZE", "10000")),
+    max_bytes=int(os.environ.get("MCP_AUDIT_MAX_BYTES", str(64 * 1024 * 1024))),
+    rotate_seconds=float(os.environ.get("MCP_AUDIT_ROTATE_SECONDS", str(24 * 3600))),
+    on_rotate=_on_audit_rotate,
+)
+atexit.register(audit_writer.close)
+
+# --- Retention: per-kind TTLs (days, 0 keeps forever) and an optional quota for blobs
+# Expiry is opt-in: every TTL defaults to 0, so nothing is deleted for its age unless configured
+retention = RetentionSweeper(
+    blobs,
+    audit_segment_dir=audit_writer.segment_dir,
+    uploads_dir=uploads.root,
+    legacy_dir=STORAGE_DIR,
+    ttl_seconds={
+        "salary": float(os.environ.get("MCP_RETENTION_SALARY_DAYS", "0")) * DAY,
+        "sanction": float(os.environ.get("MCP_RETENTION_SANCTION_DAYS", "0")) * DAY,
+        "audit": float(os.environ.get("MCP_RETENTION_AUDIT_DAYS", "0")) * DAY,
+        "upload": float(os.environ.get("MCP_RETENTION_UPLOAD_DAYS", "0")) * DAY,
+    },
+    quota_bytes=int(os.environ.get("MCP_STORAGE_QUOTA_BYTES", "0")),
+    interval=float(os.environ.get("MCP_RETENTION_INTERVAL_SECONDS", "60")),
+)
+atexit.register(retention.stop)
+
+# --- PDF rendering: sanction letters render in worker processes, off the event loop
+pdf_pool = RenderPool(
+    workers=int(os.environ.get("MCP_PDF_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))),
+    queue_size=int(os.environ.get("MCP_PDF_QUEUE_SIZE", "64")),
+)
+atexit.register(pdf_pool.shutdown)
+
+# --- Underwriting policy: rules live in a versioned JSON decision table that is
+# re-read when the file changes, so policy updates need no restart
+underwriting_policy = PolicyStore(
+    os.environ.get(
+        "MCP_UNDERWRITING_POLICY",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "underwriting_policy.json"),
+    ),
+    check_interval=float(os.environ.get("MCP_UNDERWRITING_POLICY_CHECK_SECONDS", "1")),
+)
+
+# --- Helper: sanction letter fields, then render in the PDF pool and store as a blob
+def sanction_letter_fields(
+    cust: Dict[str, Any],
+    amount: int,
+    tenure_months: int,
+    interest_rate: float,
+    date: Optional[str] = None,
+) -> Dict[str, Any]:
+    return {
+        "date": date or datetime.utcnow().strftime('%Y-%m-%d'),
+        "name": cust.get("name"),
+        "customer_id": cust.get("customer_id"),
+        "amount": amount,
+        "tenure_months": tenure_months,
+        "interest_rate": interest_rate,
+    }
+
+
+# Letters are stored uncompressed: sanction_letter_path is handed to agents as the
+# letter's PDF file, and at ~2 KB a letter gains little from compression anyway.
+async def render_sanction_letter_blob(fields: Dict[str, Any]):
+    pdf = await pdf_pool.render(fields)
+    return await run_io(functools.partial(
+        blobs.put_bytes, pdf, "sanction", ".pdf", compress=False, holder=fields["customer_id"]
+    ))
+
+
+# --- Helper: amortization schedule rows for months [first, last] (1-based)
+# Closed-form balances keep every page independent of the ones before it, so
+# any window of a long schedule is computed without replaying earlier months.
+def amortization_rows(
+    P: float, annual_rate: float, n_months: int, first: int, last: int
+) -> Dict[str, Any]:
+    emi = compute_emi(P, annual_rate, n_months)
+    r = annual_rate / 12.0 / 100.0
+    k = np.arange(first - 1, last + 1, dtype=np.float64)
+
     if r == 0:
-        return float(P/ n_months)
-    pow_factor = (1 + r) ** n_months
-    emi = P * r * (pow_factor / (pow_factor - 1))
-    return float(round(emi, 2))
+        balance = P - emi * k
+    else:
+        growth = np.power(1.0 + r, k)
+        balance = P * growth - emi * (growth - 1.0) / r
+
+    interest = balance[:-1] * r
+    payment = np.full(interest.shape, emi)
+    if last == n_months:
+        # the final instalment absorbs the paise left over from rounding the EMI
+        payment[-1] = balance[-2] + interest[-1]
+        balance[-1] = 0.0
+    principal = payment - interest
+
+    months = np.arange(first, last + 1)
+    return {
+        "emi": emi,
+        "rows": [
+            {
+                "month": int(m),
+                "payment": round(float(pay), 2),
+                "principal": round(float(prin), 2),
+                "interest": round(float(intr), 2),
+                "balance": round(float(bal), 2),
+            }
+            for m, pay, prin, intr, bal in zip(
+                months, payment, principal, interest, np.maximum(balance[1:], 0.0)
+            )
+        ],
+    }
 
 # ---------------------------------------------------------------------------
 # TOOLS
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@tool_metrics.instrument
 async def get_customer_info(customer_id: str) -> Dict[str, Any]:
     """Fetch customer basic information based in customer_id."""
-    cust = CUSTOMERS.get(customer_id)
-    if not cust:
-        raise ToolError(f"customer not found: {customer_id}")
+    cust = await asyncio.to_thread(lookup_customer_with_score, customer_id, "get_customer_info")
     return {"result": cust}
 
 
 @mcp.tool()
-def verify_kyc(customer_id: str, phone: str, city: str) -> Dict[str, Any]:
+@tool_metrics.instrument
+async def verify_kyc(customer_id: str, phone: str, city: str) -> Dict[str, Any]:
     """Verify phone and address(city) for a customer using customer_id."""
-    cust = CUSTOMERS.get(customer_id)
-    if not cust:
-        raise ToolError(f"customer not found: {customer_id}")
+    cust = await asyncio.to_thread(lookup_customer, customer_id, "verify_kyc")
 
     phone_verified = (cust.get("phone") == phone)
     address_verified = (cust.get("city") == city)
@@ -76,18 +360,40 @@ def verify_kyc(customer_id: str, phone: str, city: str) -> Dict[str, Any]:
 
 
 @mcp.tool()
-def get_credit_score(customer_id: str) -> Dict[str, Any]:
+@tool_metrics.instrument
+async def get_credit_score(customer_id: str) -> Dict[str, Any]:
     """Return credit score for customer using there customer id."""
-    cust = CUSTOMERS.get(customer_id)
-    if not cust:
+    score = await asyncio.to_thread(lookup_credit_score, customer_id)
+    if score is None:
         raise ToolError(f"customer not found: {customer_id}")
     return {
-        "result": {"credit_score": cust.get("credit_score")},
+        "result": {"credit_score": score},
+    }
+
+
+@mcp.tool()
+@tool_metrics.instrument
+async def prequalify(customer_id: str, phone: str, city: str) -> Dict[str, Any]:
+    """
+    Customer profile, KYC check (phone and city) and credit score in one call; returns the
+    same data as get_customer_info, verify_kyc and get_credit_score together.
+    """
+    cust = await asyncio.to_thread(lookup_customer_with_score, customer_id, "prequalify")
+    return {
+        "result": {
+            "customer": cust,
+            "kyc": {
+                "phone_verified": cust.get("phone") == phone,
+                "address_verified": cust.get("city") == city,
+            },
+            "credit_score": cust["credit_score"],
+        }
     }
 
 
 @mcp.tool()
-def underwrite_loan(
+@tool_metrics.instrument
+async def underwrite_loan(
     customer_id: str,
     requested_amount: int,
     tenure_months: int = 36,
@@ -96,195 +402,899 @@ def underwrite_loan(
     salary_slip_resource: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Underwriting decision using stated rules and return decision and reason of approval or rejection."""
-    cust = CUSTOMERS.get(customer_id)
-    if not cust:
-        raise ToolError(f"customer not found: {customer_id}")
-
-    score = cust.get("credit_score", 0)
-    pre_limit = cust.get("pre_approved_limit", 0)
-    requested = requested_amount
-    tenure = tenure_months
+    cust = await asyncio.to_thread(lookup_customer_with_score, customer_id, "underwrite_loan")
 
-    if score < 700:
-        return {
-            "result": {
-                "decision": "reject",
-                "reason": "credit_score_below_700",
-                "emi": "not calculated",
-                "salary_slip_resource": salary_slip_resource
-            }
+    table = underwriting_policy.table
+    salary = (
+        salary_provided
+        if salary_provided is not None
+        else cust.get("salary_monthly", 0)
+    )
+    outcome = table.decide(
+        {
+            "score": cust["credit_score"] or 0,
+            "pre_limit": cust.get("pre_approved_limit", 0),
+            "requested": requested_amount,
+            "salary": salary,
+            "has_salary_evidence": bool(salary_slip_resource) or salary_provided is not None,
+            "tenure_months": tenure_months,
+            "annual_rate": annual_rate,
+        },
+        lazy={"emi": lambda: compute_emi(requested_amount, annual_rate, tenure_months)},
+    )
+    return {
+        "result": {
+            "decision": outcome["decision"],
+            "reason": outcome["reason"],
+            "emi": outcome["emi"] if outcome["emi"] is not None else "not calculated",
+            "salary_slip_resource": salary_slip_resource,
+            "policy_version": table.version,
         }
+    }
 
-    if requested <= pre_limit:
-        emi = compute_emi(requested, annual_rate, tenure)
-        return {
-            "result": {
-                "decision": "approve",
-                "reason": "within_pre_approved_limit",
-                "emi": emi,
-                "salary_slip_resource": salary_slip_resource
-            }
-        }
 
-    if requested <= 2 * pre_limit:
-        if not salary_slip_resource and salary_provided is None:
-            return {
-                "result": {
-                    "decision": "require_salary_slip",
-                    "reason": "salary_slip_required",
-                    "emi": "not calculated",
-                    "salary_slip_resource": salary_slip_resource
-                }
-            }
+@mcp.tool()
+@tool_metrics.instrument
+def compute_emi_batch(
+    principals: List[float],
+    annual_rates: List[float],
+    tenures_months: List[int],
+) -> Dict[str, Any]:
+    """Compute EMIs for many loans in one call. annual_rates and tenures_months may hold a single value applied to every principal."""
+    if not principals:
+        return {"result": {"emis": []}}
 
-        salary = (
-            salary_provided
-            if salary_provided is not None
-            else cust.get("salary_monthly", 0)
-        )
-        emi = compute_emi(requested, annual_rate, tenure)
-
-        if emi <= 0.5 * salary:
-            return {
-                "result": {
-                    "decision": "approve",
-                    "reason": "emi_within_50pct_salary",
-                    "emi": emi,
-                    "salary_slip_resource": salary_slip_resource
-                },
-            }
-        else:
-            return {
-                "result": {
-                    "decision": "reject",
-                    "reason": "emi_exceeds_50pct_salary",
-                    "emi": emi,
-                    "salary_slip_resource": salary_slip_resource
-                },
-            }
+    rows = len(principals)
+    for name, values in (("annual_rates", annual_rates), ("tenures_months", tenures_months)):
+        if len(values) not in (1, rows):
+            raise ToolError(f"{name} must have 1 or {rows} values, got {len(values)}")
+    if any(t <= 0 for t in tenures_months):
+        raise ToolError("tenures_months must be positive")
+
+    emis = compute_emi_batch_values(principals, annual_rates, tenures_months)
+    return {"result": {"emis": emis.tolist()}}
+
+
+SCHEDULE_MAX_CHUNK_MONTHS = 600
 
+@mcp.tool()
+@tool_metrics.instrument
+def amortization_schedule(
+    principal: float,
+    annual_rate: float = 12.0,
+    tenure_months: int = 36,
+    start_month: int = 1,
+    chunk_months: int = 120,
+) -> Dict[str, Any]:
+    """
+    Return the month-by-month payment/principal/interest/balance table for a loan, one chunk
+    at a time. Call again with start_month=next_start_month until next_start_month is null.
+    """
+    if principal <= 0:
+        raise ToolError("principal must be positive")
+    if tenure_months <= 0:
+        raise ToolError("tenure_months must be positive")
+    if not 1 <= start_month <= tenure_months:
+        raise ToolError(f"start_month must be between 1 and {tenure_months}")
+    if not 1 <= chunk_months <= SCHEDULE_MAX_CHUNK_MONTHS:
+        raise ToolError(f"chunk_months must be between 1 and {SCHEDULE_MAX_CHUNK_MONTHS}")
+
+    last_month = min(start_month + chunk_months - 1, tenure_months)
+    chunk = amortization_rows(principal, annual_rate, tenure_months, start_month, last_month)
     return {
         "result": {
-            "decision": "reject",
-            "reason": "amount_exceeds_2x_pre_approved",
-            "emi": "not calculated",
-            "salary_slip_resource": salary_slip_resource
-        },
+            "emi": chunk["emi"],
+            "tenure_months": tenure_months,
+            "rows": chunk["rows"],
+            "next_start_month": last_month + 1 if last_month < tenure_months else None,
+        }
     }
 
 
+class LoanApplication(BaseModel):
+    customer_id: str
+    requested_amount: int
+    tenure_months: int = Field(default=36, gt=0)
+    annual_rate: float = 12.0
+    salary_provided: Optional[int] = None
+    salary_slip_resource: Optional[str] = None
+
+
+@mcp.tool()
+@tool_metrics.instrument
+async def underwrite_loans_batch(applications: List[LoanApplication]) -> Dict[str, Any]:
+    """
+    Underwrite many loan applications in one call with the same policy table as underwrite_loan.
+    Returns one decision/reason/emi row per application, in input order.
+    """
+    if not applications:
+        return {"result": {"decisions": []}}
+
+    found_custs = await asyncio.to_thread(customers.get_many, [a.customer_id for a in applications])
+    custs = [found_custs.get(a.customer_id) for a in applications]
+    found = np.array([c is not None for c in custs])
+    score = np.array([c.get("credit_score", 0) if c else 0 for c in custs])
+    pre_limit = np.array([c.get("pre_approved_limit", 0) if c else 0 for c in custs])
+    requested = np.array([a.requested_amount for a in applications])
+    has_salary_evidence = np.array(
+        [bool(a.salary_slip_resource) or a.salary_provided is not None for a in applications]
+    )
+    salary = np.array([
+        a.salary_provided if a.salary_provided is not None
+        else (c.get("salary_monthly", 0) if c else 0)
+        for a, c in zip(applications, custs)
+    ])
+    annual_rate = np.array([a.annual_rate for a in applications], dtype=float)
+    tenure = np.array([a.tenure_months for a in applications])
+    emi = compute_emi_batch_values(requested, annual_rate, tenure)
+
+    table = underwriting_policy.table
+    chosen, rules = table.decide_batch({
+        "score": score,
+        "pre_limit": pre_limit,
+        "requested": requested,
+        "salary": salary,
+        "has_salary_evidence": has_salary_evidence,
+        "tenure_months": tenure,
+        "annual_rate": annual_rate,
+        "emi": emi,
+    })
+
+    decisions = []
+    for i, a in enumerate(applications):
+        if not found[i]:
+            decisions.append({
+                "decision": "error",
+                "reason": "customer_not_found",
+                "emi": "not calculated",
+                "salary_slip_resource": a.salary_slip_resource,
+                "policy_version": table.version,
+            })
+            continue
+        rule = rules[chosen[i]]
+        decisions.append({
+            "decision": rule.decision,
+            "reason": rule.reason,
+            "emi": float(emi[i]) if rule.with_emi else "not calculated",
+            "salary_slip_resource": a.salary_slip_resource,
+            "policy_version": table.version,
+        })
+    return {"result": {"decisions": decisions}}
+
+
 @mcp.tool()
-def upload_salary_slip(
+@tool_metrics.instrument
+@idempotency.idempotent
+async def upload_salary_slip(
     customer_id: str,
     content_base64: str="VGhpcyBpcyBhIGRlbW8gc2FsYXJ5IHNsaXA=",
+    idempotency_key: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Upload a salary slip for a customer by using writing the content_base_64 in a file and saving 
     it in the given location.
 
+    Pass an idempotency_key to make retries safe: a repeat with the same key returns the
+    first result.
     """
-    if customer_id not in CUSTOMERS:
+    if not await asyncio.to_thread(customers.exists, customer_id):
         raise ToolError(f"customer not found: {customer_id}")
 
-    ext = ".pdf"
-    stored_name = f"salary_{customer_id}_{uuid.uuid4().hex}{ext}"
-    path = os.path.join(STORAGE_DIR, stored_name)
+    blob = await run_io(store_salary_slip, content_base64, customer_id)
+
+    resource_url = f"resource://{blob.name}"
+    return {        
+            "salary_slip_resource": resource_url
+    }
 
+
+def store_salary_slip(content_base64: str, customer_id: str):
     try:
         raw = base64.b64decode(content_base64)
     except Exception as e:
         raise ToolError(f"invalid base64 content: {e}")  # visible to client
+    return blobs.put_bytes(raw, kind="salary", ext=".pdf", holder=customer_id)
 
-    with open(path, "wb") as f:
-        f.write(raw)
 
-    resource_url = f"resource://{stored_name}"
-    return {        
+@mcp.tool()
+@tool_metrics.instrument
+@idempotency.idempotent
+async def begin_salary_slip_upload(
+    customer_id: str,
+    total_size: Optional[int] = None,
+    sha256: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Start a chunked salary slip upload for large documents. Send the bytes with
+    append_salary_slip_chunk (or as raw binary to http_upload_path, without base64), then
+    call commit_salary_slip_upload (or abort_salary_slip_upload to give up). total_size
+    and the whole-file sha256 are optional but
+    let the server check the upload when it is committed. With an idempotency_key a
+    retried begin returns the same upload_id instead of opening a second session.
+    """
+    if not await asyncio.to_thread(customers.exists, customer_id):
+        raise ToolError(f"customer not found: {customer_id}")
+
+    meta = await run_io(
+        functools.partial(uploads.begin, customer_id, kind="salary", total_size=total_size, sha256=sha256)
+    )
+    return {
+        "result": {
+            "upload_id": meta["upload_id"],
+            "offset": meta["offset"],
+            "max_chunk_bytes": uploads.max_chunk_bytes,
+            "http_upload_path": f"/uploads/{meta['upload_id']}",
+        }
+    }
+
+
+@mcp.tool()
+@tool_metrics.instrument
+@idempotency.idempotent
+async def append_salary_slip_chunk(
+    upload_id: str,
+    offset: int,
+    chunk_base64: str,
+    chunk_sha256: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Append one chunk to an upload. offset must equal the bytes received so far; after a
+    dropped connection call get_salary_slip_upload to find where to resume, or resend
+    the chunk with the same idempotency_key to get its original result back.
+    """
+    try:
+        data = await run_io(base64.b64decode, chunk_base64)
+    except Exception as e:
+        raise ToolError(f"invalid base64 content: {e}")
+
+    try:
+        meta = await run_io(uploads.append, upload_id, offset, data, chunk_sha256)
+    except UploadError as e:
+        raise ToolError(str(e))
+    return {"result": {"upload_id": upload_id, "offset": meta["offset"]}}
+
+
+@mcp.tool()
+@tool_metrics.instrument
+async def get_salary_slip_upload(upload_id: str) -> Dict[str, Any]:
+    """Return the bytes received so far for an upload, i.e. the offset to resume from."""
+    try:
+        meta = await run_io(uploads.status, upload_id)
+    except UploadError as e:
+        raise ToolError(str(e))
+    return {
+        "result": {
+            "upload_id": upload_id,
+            "offset": meta["offset"],
+            "total_size": meta["total_size"],
+        }
+    }
+
+
+@mcp.tool()
+@tool_metrics.instrument
+@idempotency.idempotent
+async def commit_salary_slip_upload(
+    upload_id: str,
+    sha256: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Finish a chunked upload, verify its checksum and return the salary slip resource URL.
+    A commit retried with the same idempotency_key returns the same URL.
+    """
+    try:
+        blob = await run_io(uploads.commit, upload_id, sha256, ".pdf")
+    except UploadError as e:
+        raise ToolError(str(e))
+
+    resource_url = f"resource://{blob.name}"
+    return {
             "salary_slip_resource": resource_url
     }
 
 
-from reportlab.pdfgen import canvas  
+@mcp.tool()
+@tool_metrics.instrument
+@idempotency.idempotent
+async def abort_salary_slip_upload(upload_id: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Discard an unfinished chunked upload and the bytes received so far. An abort retried
+    with the same idempotency_key succeeds again instead of reporting an unknown upload.
+    """
+    try:
+        await run_io(uploads.abort, upload_id)
+    except UploadError as e:
+        raise ToolError(str(e))
+    return {"status": "ok"}
+
 
 @mcp.tool()
-def generate_sanction_letter(
+@tool_metrics.instrument
+@idempotency.idempotent
+async def generate_sanction_letter(
     customer_id: str,
     amount: int,
     tenure_months: int = 36,
     interest_rate: float = 12.0,
+    idempotency_key: Optional[str] = None,
 ) -> Dict[str, Any]:
-    """Generate a sanction letter PDF and return a resource URL and path."""
-    cust = CUSTOMERS.get(customer_id)
-    if not cust:
-        raise ToolError(f"customer not found: {customer_id}")
+    """
+    Generate a sanction letter PDF and return a resource URL and path. A retry with the
+    same idempotency_key returns the first letter without rendering it again.
+    """
+    cust = await asyncio.to_thread(lookup_customer, customer_id, "generate_sanction_letter")
 
-    filename = f"sanction_{customer_id}_{uuid.uuid4().hex}.pdf"
-    path = os.path.join(STORAGE_DIR, filename)
-
-    c = canvas.Canvas(path)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, 800, "Sanction Letter")
-    c.setFont("Helvetica", 11)
-    c.drawString(50, 770, f"Date: {datetime.utcnow().strftime('%Y-%m-%d')}")
-    c.drawString(50, 750, f"Customer: {cust.get('name')} (ID: {customer_id})")
-    c.drawString(50, 730, f"Approved Amount: INR {amount}")
-    c.drawString(50, 710, f"Tenure: {tenure_months} months")
-    c.drawString(50, 690, f"Interest Rate (annual): {interest_rate}%")
-    c.drawString(
-        50,
-        660,
-        "This is a demo sanction letter generated by MCP server.",
-    )
-    c.save()
+    fields = sanction_letter_fields(cust, amount, tenure_months, interest_rate)
+    try:
+        blob = await render_sanction_letter_blob(fields)
+    except RenderQueueFull as e:
+        raise ToolError(f"sanction letter renderer is busy, retry later: {e}")
+    except RenderWorkerLost as e:
+        raise ToolError(f"sanction letter renderer failed, retry later: {e}")
 
-    resource_url = f"resource://{filename}"
+    resource_url = f"resource://{blob.name}"
     return {
         "result": {
             "sanction_letter_resource": resource_url,
-            "sanction_letter_path": path,
+            "sanction_letter_path": blob.path,
         },
     }
 
 
+class SanctionLetterRequest(BaseModel):
+    customer_id: str
+    amount: int
+    tenure_months: int = Field(default=36, gt=0)
+    interest_rate: float = 12.0
+
+
+SANCTION_BATCH_MAX = int(os.environ.get("MCP_SANCTION_BATCH_MAX", "1000"))
+
+
+# --- Helper: progress notification sent on the stream of the request it belongs to
+# Context.report_progress sends it unrelated to any request, which stateless streamable
+# HTTP has no stream for, so it would never reach /mcp clients.
+async def report_progress(ctx: Context, progress: float, total: float, message: str) -> None:
+    meta = ctx.request_context.meta
+    token = meta.progressToken if meta else None
+    if token is None:
+        return
+    await ctx.session.send_progress_notification(
+        token, progress, total, message, related_request_id=ctx.request_id
+    )
+
+
 @mcp.tool()
-def log_event(event: Dict[str, Any]) -> Dict[str, Any]:
-    """Append an audit event to a log file."""
-    log_path = os.path.join(STORAGE_DIR, "mcp_audit.log")
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(
-            json.dumps(
-                {"ts": datetime.utcnow().isoformat(), "event": event},
-                ensure_ascii=False,
-            )
-            + "\n"
-        )
+@tool_metrics.instrument
+@idempotency.idempotent
+async def generate_sanction_letters_batch(
+    letters: List[SanctionLetterRequest],
+    ctx: Context,
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Generate many sanction letters in one call, rendered in parallel across the PDF workers.
+    Sends a progress notification per finished letter and returns one row per request, in
+    input order, with the resource URL or an error. A batch retried with the same
+    idempotency_key returns the first call's rows, without progress notifications.
+    """
+    if len(letters) > SANCTION_BATCH_MAX:
+        raise ToolError(f"at most {SANCTION_BATCH_MAX} letters per batch, got {len(letters)}")
+    if not letters:
+        return {"result": {"letters": []}}
+
+    found = await asyncio.to_thread(customers.get_many, [req.customer_id for req in letters])
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    # keep every worker busy plus one letter each in hand, without filling the shared
+    # render queue that single generate_sanction_letter calls also wait in
+    slots = asyncio.Semaphore(2 * pdf_pool.workers)
+
+    async def one(i: int, req: SanctionLetterRequest) -> Tuple[int, Dict[str, Any]]:
+        row = {"customer_id": req.customer_id}
+        cust = found.get(req.customer_id)
+        if not cust:
+            return i, {**row, "status": "error", "error": "customer_not_found"}
+        fields = sanction_letter_fields(cust, req.amount, req.tenure_months, req.interest_rate, today)
+        async with slots:
+            try:
+                blob = await render_sanction_letter_blob(fields)
+            except RenderQueueFull:
+                return i, {**row, "status": "error", "error": "renderer_busy"}
+            except RenderWorkerLost:
+                return i, {**row, "status": "error", "error": "renderer_failed"}
+        return i, {
+            **row,
+            "status": "ok",
+            "sanction_letter_resource": f"resource://{blob.name}",
+            "sanction_letter_path": blob.path,
+        }
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(letters)
+    done = 0
+    for next_done in asyncio.as_completed([one(i, req) for i, req in enumerate(letters)]):
+        i, row = await next_done
+        results[i] = row
+        done += 1
+        await report_progress(ctx, done, len(letters), f"{row['customer_id']}: {row['status']}")
+
+    failed = sum(1 for r in results if r["status"] != "ok")
+    return {"result": {"letters": results, "generated": len(letters) - failed, "failed": failed}}
+
+
+@mcp.tool()
+@tool_metrics.instrument
+@idempotency.idempotent
+async def log_event(event: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Append an audit event to a log file; with an idempotency_key a retry is written once.
+    Under the "batch" and "event" fsync policies the call returns once the event is on disk.
+    """
+    line = json.dumps(
+        {"ts": datetime.utcnow().isoformat(), "event": event},
+        ensure_ascii=False,
+    ) + "\n"
+    written = audit_writer.offer(line)
+    if written is None:
+        # queue is full: wait off the event loop for the flusher to catch up
+        try:
+            written = await asyncio.to_thread(audit_writer.put, line)
+        except AuditQueueFull as e:
+            raise ToolError(f"audit log is backlogged, retry later: {e}")
+    if audit_writer.fsync != "none":
+        try:
+            await asyncio.wrap_future(written)
+        except Exception as e:
+            raise ToolError(f"audit log write failed: {e}")
     return {"status": "ok"}
 
 
 @mcp.tool()
+@tool_metrics.instrument
+def get_underwriting_policy() -> Dict[str, Any]:
+    """Version, source file and load status of the underwriting decision table in force."""
+    return {"result": underwriting_policy.info()}
+
+
+@mcp.tool()
+@tool_metrics.instrument
+def invalidate_customer_cache(customer_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Drop cached profile and credit score for a customer (or all customers) after an upstream
+    change. Caches are per process: with several HTTP workers (MCP_WORKERS) this clears only
+    the worker that handles the call, and the others serve their entries until the cache TTL.
+    """
+    invalidate_customer(customer_id)
+    return {"status": "ok"}
+
+
+@mcp.tool()
+@tool_metrics.instrument
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and sizes of the customer profile, credit score and idempotency caches."""
+    return {
+        "result": {
+            cache.name: cache.stats()
+            for cache in (profile_cache, credit_score_cache, idempotency.results)
+        }
+    }
+
+
+@mcp.tool()
+@tool_metrics.instrument
 def health() -> Dict[str, Any]:
     """Simple health check."""
     return {"status": "ok", "time": datetime.utcnow().isoformat()}
 
+# --- Readiness: a server past any of these limits reports "degraded" (HTTP 503 on /ready)
+READINESS_LIMITS = {
+    "event_loop_lag_ms": float(os.environ.get("MCP_READY_MAX_LOOP_LAG_MS", "100")),
+    "in_flight_calls": int(os.environ.get("MCP_READY_MAX_IN_FLIGHT", "256")),
+    "pdf_queue_depth": int(os.environ.get("MCP_READY_MAX_PDF_QUEUE", str(max(1, pdf_pool.queue_size // 2)))),
+    "audit_backlog": int(os.environ.get("MCP_READY_MAX_AUDIT_BACKLOG", "5000")),
+    "customer_store_ms": float(os.environ.get("MCP_READY_MAX_STORE_MS", "250")),
+}
+READINESS_MIN_FREE_BYTES = int(os.environ.get("MCP_READY_MIN_FREE_MB", "512")) * 1024 * 1024
+
+
+async def readiness_report() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    # time for a bare yield to come back round: how long other callbacks hold the loop
+    start = loop.time()
+    await asyncio.sleep(0)
+    loop_lag = loop.time() - start
+
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(customers.exists, "__readiness_probe__")
+        store_ms = 1000 * (time.perf_counter() - start)
+        store_error = None
+    except Exception as e:
+        store_ms = 1000 * (time.perf_counter() - start)
+        store_error = str(e)
+
+    free_bytes = shutil.disk_usage(STORAGE_DIR).free
+    checks = {
+        "event_loop_lag_ms": round(1000 * loop_lag, 3),
+        "in_flight_calls": tool_metrics.in_flight(),
+        "pdf_queue_depth": pdf_pool.queue_depth,
+        "audit_backlog": audit_writer.backlog,
+        "customer_store_ms": round(store_ms, 3),
+    }
+    reasons = [name for name, value in checks.items() if value > READINESS_LIMITS[name]]
+    if free_bytes < READINESS_MIN_FREE_BYTES:
+        reasons.append("storage_free_bytes")
+    if store_error:
+        reasons.append("customer_store_error")
+    if pdf_pool.broken:
+        reasons.append("pdf_pool_broken")
+
+    return {
+        "status": "degraded" if reasons else "ready",
+        "reasons": reasons,
+        **checks,
+        "pdf_in_flight": pdf_pool.in_flight,
+        "pdf_pool_broken": pdf_pool.broken,
+        "pdf_worker_restarts": pdf_pool.restarts,
+        "storage_free_bytes": free_bytes,
+        "customer_store_error": store_error,
+        "limits": {**READINESS_LIMITS, "storage_free_bytes": READINESS_MIN_FREE_BYTES},
+    }
+
+
+@mcp.tool()
+async def readiness() -> Dict[str, Any]:
+    """Load and dependency health; status is "degraded" when the server should shed traffic."""
+    return {"result": await readiness_report()}
+
+
+@mcp.tool()
+def metrics() -> Dict[str, Any]:
+    """Per-tool call counts, errors, in-flight calls and latency percentiles for this server process."""
+    return {"result": tool_metrics.snapshot()}
+
+
 # ---------------------------------------------------------------------------
 # RESOURCES
 # ---------------------------------------------------------------------------
 
-@mcp.resource("resource://{filename}")
-def fetch_resource(filename: str) -> bytes:
+# --- Helper: resource name -> (file on disk, codec it is stored with)
+# Content-addressed names resolve inside the blob store; older uuid-named files
+# written before the store existed are still served (uncompressed) from STORAGE_DIR.
+# Only those generated document names are: the customer DB and the audit log live
+# in the same directory and must never be readable as resources.
+def resolve_resource(filename: str) -> Tuple[str, str]:
+    found = blobs.locate(filename)
+    if found is not None:
+        blobs.touch(BLOB_NAME.match(filename).group(1))
+    if found is None and LEGACY_NAME.match(filename):
+        legacy = os.path.join(STORAGE_DIR, filename)
+        if os.path.isfile(legacy):
+            found = (legacy, "")
+    if found is None:
+        raise ToolError(f"resource not found: {filename}")
+    return found
+
+
+# --- Helper: size, ETag and mime type of a stored resource
+# Blob ETags are the content hash itself, so they stay valid across servers and
+# restarts; legacy files fall back to a hash of mtime and size.
+def resource_info(filename: str) -> Dict[str, Any]:
+    path, codec = resolve_resource(filename)
+    st = os.stat(path)
+    size = st.st_size
+    m = BLOB_NAME.match(filename)
+    if m:
+        etag = m.group(1)
+        if codec:
+            # sizes always describe the original bytes, which the index remembers
+            size = blobs.size(etag)
+            if size is None:
+                with blobs.open_stored(path, codec) as f:
+                    size = f.seek(0, os.SEEK_END)
+    else:
+        etag = hashlib.md5(f"{st.st_mtime_ns}-{st.st_size}".encode()).hexdigest()
+    return {
+        "path": path,
+        "codec": codec,
+        "size": size,
+        "stored_size": st.st_size,
+        "etag": etag,
+        "mime_type": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+    }
+
+
+def _resource_name(name: str) -> str:
+    return name[len("resource://"):] if name.startswith("resource://") else name
+
+
+RESOURCE_MAX_RANGE_BYTES = int(os.environ.get("MCP_RESOURCE_MAX_RANGE_BYTES", str(1024 * 1024)))
+
+@mcp.tool()
+@tool_metrics.instrument
+async def get_resource_info(filename: str) -> Dict[str, Any]:
     """
-    Return the raw bytes of a stored resource (PDF, salary slip, etc.).
+    Return size, ETag and mime type of a stored resource. Compare the ETag with a cached
+    copy to skip downloading a sanction letter or salary slip again.
     """
-    path = os.path.join(STORAGE_DIR, filename)
-    if not os.path.exists(path):
-        raise ToolError(f"resource not found: {filename}")
+    name = _resource_name(filename)
+    info = await run_io(resource_info, name)
+    info.pop("path")
+    info.pop("codec")
+    info["http_path"] = f"/resources/{name}"
+    return {"result": info}
+
 
-    with open(path, "rb") as f:
+@mcp.tool()
+@tool_metrics.instrument
+@idempotency.idempotent
+async def release_document(
+    filename: str, customer_id: str, idempotency_key: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Drop a customer's reference to a resource URL returned from an upload or sanction
+    letter for them, once it is no longer needed. Each customer holds at most one reference
+    per document, so releasing one the customer does not hold (or no longer holds) is an
+    error. A document with no references left is deleted by the retention sweeper (or kept
+    as cache while under MCP_STORAGE_QUOTA_BYTES). With an idempotency_key a retry returns
+    the first call's result instead of that error.
+    """
+    name = _resource_name(filename)
+    m = BLOB_NAME.match(name)
+    remaining = await run_io(blobs.decref, m.group(1), customer_id) if m else None
+    if remaining is None:
+        raise ToolError(f"customer {customer_id} holds no reference to resource://{name}")
+    return {"result": {"resource": f"resource://{name}", "references": remaining}}
+
+
+# --- Helper: one fetch_resource_range read, run on the storage I/O pool
+def read_resource_range(
+    name: str, offset: int, length: int, if_none_match: Optional[str]
+) -> Dict[str, Any]:
+    info = resource_info(name)
+    if if_none_match and if_none_match == info["etag"]:
+        return {"not_modified": True, "etag": info["etag"], "size": info["size"]}
+    if offset < 0 or length <= 0:
+        raise ToolError("offset must be >= 0 and length > 0")
+
+    length = min(length, RESOURCE_MAX_RANGE_BYTES, max(info["size"] - offset, 0))
+    data = blobs.read_range(info["path"], info["codec"], offset, length) if length else b""
+    return {
+        "not_modified": False,
+        "etag": info["etag"],
+        "size": info["size"],
+        "offset": offset,
+        "length": len(data),
+        "data_base64": base64.b64encode(data).decode("ascii"),
+    }
+
+
+@mcp.tool()
+@tool_metrics.instrument
+async def fetch_resource_range(
+    filename: str,
+    offset: int = 0,
+    length: int = RESOURCE_MAX_RANGE_BYTES,
+    if_none_match: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Read a byte range of a stored resource as base64 so large documents can be fetched in
+    pieces. Pass the ETag of a cached copy as if_none_match to get not_modified instead of data.
+    """
+    return {"result": await run_io(read_resource_range, _resource_name(filename), offset, length, if_none_match)}
+
+
+# --- Resource reads over MCP
+# JSON-RPC has no binary frames, so a resource read always travels as one base64
+# "blob" with its mime type; the file is read once, off the event loop, and encoded
+# once by the SDK. Clients that need the bytes without that 33% overhead use the
+# HTTP paths below (GET /resources/<name>, PUT /uploads/<upload_id>) instead.
+def read_resource_bytes(filename: str) -> bytes:
+    path, codec = resolve_resource(filename)
+    with blobs.open_stored(path, codec) as f:
         return f.read()
 
+
+# Every stored document is a PDF. The extension is checked here rather than written
+# into the template: FastMCP turns "resource://{name}.pdf" into a regex without
+# escaping the dot, so it would also serve <name>.pdf for "resource://<name>Xpdf".
+@mcp.resource("resource://{filename}", mime_type="application/pdf")
+async def fetch_pdf_resource(filename: str) -> bytes:
+    """
+    Return a stored PDF (sanction letter, salary slip) as a binary resource.
+    """
+    if not filename.endswith(".pdf"):
+        raise ToolError(f"resource not found: {filename}")
+    return await run_io(read_resource_bytes, filename)
+
+
+# --- HTTP: plain GET of stored documents, outside the MCP JSON framing
+# Starlette's FileResponse streams the file in chunks, answers Range requests and
+# hands the whole file to the server (http.response.pathsend) when it supports it, so
+# the server can sendfile() it from the page cache straight to the socket. A gzip blob
+# goes out the same way, as Content-Encoding: gzip, to clients that accept it; other
+# compressed blobs are decompressed while streaming, and a single-range Range request
+# on one gets a 206 of just that range of the original bytes.
+def _iter_range(path: str, codec: str, start: int, end: int):
+    while start < end:
+        chunk = blobs.read_range(path, codec, start, min(1024 * 1024, end - start))
+        if not chunk:
+            return
+        start += len(chunk)
+        yield chunk
+
+
+def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    [start, end) of a single-range "bytes=" Range header. None for anything else
+    (malformed, multiple ranges), which is answered with the whole body; start >= end
+    when the range is unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip() != "bytes" or not dash or not (first + last).isdigit():
+        return None
+    if not first:
+        # suffix range: the last N bytes
+        n = int(last)
+        return (max(size - n, 0) if n else size), size
+    start = int(first)
+    if not last:
+        return start, size
+    if int(last) < start:
+        return None
+    return start, min(int(last) + 1, size)
+
+
+@mcp.custom_route("/resources/{filename}", methods=["GET", "HEAD"])
+async def http_fetch_resource(request: Request) -> Response:
+    try:
+        info = await run_io(resource_info, request.path_params["filename"])
+    except ToolError as e:
+        return Response(str(e), status_code=404)
+
+    etag = f'"{info["etag"]}"'
+    headers = {"etag": etag}
+    if info["codec"]:
+        headers["vary"] = "Accept-Encoding"
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if not info["codec"]:
+        return FileResponse(info["path"], media_type=info["mime_type"], headers=headers)
+
+    size = info["size"]
+    span = None
+    if "range" in request.headers and request.headers.get("if-range", etag) == etag:
+        span = _byte_range(request.headers["range"], size)
+    if span is None:
+        accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+        if info["codec"] == "gzip" and accepts_gzip and "range" not in request.headers:
+            return FileResponse(
+                info["path"], media_type=info["mime_type"], headers={**headers, "content-encoding": "gzip"}
+            )
+        span, status = (0, size), 200
+    elif span[0] >= span[1]:
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+    else:
+        status = 206
+        headers["content-range"] = f"bytes {span[0]}-{span[1] - 1}/{size}"
+    headers["accept-ranges"] = "bytes"
+    headers["content-length"] = str(span[1] - span[0])
+    if request.method == "HEAD":
+        return Response(status_code=status, media_type=info["mime_type"], headers=headers)
+    return StreamingResponse(
+        _iter_range(info["path"], info["codec"], *span),
+        status_code=status, media_type=info["mime_type"], headers=headers,
+    )
+
+
+# --- HTTP: raw binary upload chunks, the base64-free counterpart of append_salary_slip_chunk
+# PUT /uploads/<upload_id> with an Upload-Offset header and the bytes as the body. The
+# body is streamed to the part file in max_chunk_bytes pieces as it arrives; if the
+# connection drops, get_salary_slip_upload gives the offset to resume from.
+@mcp.custom_route("/uploads/{upload_id}", methods=["PUT"])
+async def http_upload_chunk(request: Request) -> Response:
+    upload_id = request.path_params["upload_id"]
+    try:
+        offset = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        return Response("Upload-Offset header required", status_code=400)
+
+    limit = uploads.max_chunk_bytes
+    pending = bytearray()
+    try:
+        async for piece in request.stream():
+            pending += piece
+            while len(pending) >= limit:
+                chunk = bytes(pending[:limit])
+                del pending[:limit]
+                offset = (await run_io(uploads.append, upload_id, offset, chunk))["offset"]
+        if pending:
+            offset = (await run_io(uploads.append, upload_id, offset, bytes(pending)))["offset"]
+    except UploadError as e:
+        return Response(
+            json.dumps({"error": str(e)}), status_code=409, media_type="application/json"
+        )
+    return Response(
+        json.dumps({"upload_id": upload_id, "offset": offset}),
+        media_type="application/json",
+        headers={"upload-offset": str(offset)},
+    )
+
+
+# --- HTTP: Prometheus scrape endpoint for the same metrics
+@mcp.custom_route("/metrics", methods=["GET"])
+async def http_metrics(request: Request) -> Response:
+    gauges = {
+        "mcp_pdf_render_queue_depth": ("Sanction letters waiting for a render worker.", pdf_pool.queue_depth),
+        "mcp_pdf_render_worker_restarts": ("Render pools replaced after losing a worker.", pdf_pool.restarts),
+        "mcp_audit_backlog": ("Audit lines queued but not yet written.", audit_writer.backlog),
+    }
+    for cache in (profile_cache, credit_score_cache):
+        stats = cache.stats()
+        gauges[f"mcp_cache_{cache.name}_entries"] = (f"Entries in the {cache.name} cache.", stats["entries"])
+        gauges[f"mcp_cache_{cache.name}_hit_ratio"] = (f"Hit ratio of the {cache.name} cache.", stats["hit_ratio"])
+    return Response(
+        tool_metrics.render_prometheus(gauges),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+# --- HTTP: load balancer readiness probe, 503 while degraded
+@mcp.custom_route("/ready", methods=["GET"])
+async def http_ready(request: Request) -> Response:
+    report = await readiness_report()
+    return Response(
+        json.dumps(report),
+        status_code=200 if report["status"] == "ready" else 503,
+        media_type="application/json",
+    )
+
 # ---------------------------------------------------------------------------
 # ENTRYPOINT
 # ---------------------------------------------------------------------------
 
+def start_background_services() -> None:
+    pdf_pool.warm()
+    retention.start()
+
+
+def create_http_app(include_sse: Optional[bool] = None) -> Starlette:
+    """
+    Streamable HTTP at /mcp plus, unless disabled, the legacy /sse and /messages/
+    endpoints for clients that have not migrated yet. SSE sessions live in the process
+    holding the stream, so serve_http.py turns them off when running several workers.
+    Used as a uvicorn factory by serve_http.py.
+    """
+    if include_sse is None:
+        include_sse = os.environ.get("MCP_HTTP_SSE", "1") == "1"
+
+    routes = list(mcp.streamable_http_app().routes)
+    if include_sse:
+        legacy = {mcp.settings.sse_path, mcp.settings.message_path.rstrip("/")}
+        routes += [r for r in mcp.sse_app().routes if getattr(r, "path", None) in legacy]
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        await asyncio.to_thread(start_background_services)
+        async with mcp.session_manager.run():
+            yield
+
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
 if __name__ == "__main__":
-    mcp.run(transport="sse")
+    # PDF workers start from a forkserver, which re-imports the launching script in
+    # each worker unless __main__ looks like a package entry point; running this
+    # whole file there again would open a second audit writer and the stores
+    sys.modules["__main__"].__spec__ = ModuleSpec("__main__", None)
+
+    # MCP_TRANSPORT: sse (default), streamable-http, or http for both on one port.
+    # For several worker processes run serve_http.py instead.
+    transport = os.environ.get("MCP_TRANSPORT", "sse")
+    if transport == "http":
+        uvicorn.run(create_http_app(), host=mcp.settings.host, port=mcp.settings.port)
+    else:
+        start_background_services()
+        mcp.run(transport=transport)
@@ -0,0 +1,150 @@
+# uploads.py – chunked, resumable document uploads for the NBFC MCP server
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from blob_store import BlobRef, BlobStore
+
+UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """Raised for unknown uploads, bad offsets, checksum mismatches and size overruns."""
+
+
+class UploadSessions:
+    """
+    Each upload is a <id>.part file plus a <id>.json sidecar under root. Chunks are
+    appended straight to the part file at the offset the client names, so nothing is
+    buffered in memory and the current offset is simply the part file's size. A client
+    whose connection dropped asks for the offset and resumes from there, even across a
+    server restart. Commit verifies the whole-file SHA-256 and moves the part file into
+    the blob store.
+
+    Appends and commits hold an exclusive flock on the part file, so the offset check
+    and the write are atomic across threads and across server worker processes.
+    """
+
+    def __init__(self, root: str, blobs: BlobStore, max_chunk_bytes: int) -> None:
+        self.root = root
+        self.blobs = blobs
+        self.max_chunk_bytes = max_chunk_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, upload_id: str):
+        if not UPLOAD_ID.match(upload_id):
+            raise UploadError(f"unknown upload: {upload_id}")
+        base = os.path.join(self.root, upload_id)
+        return base + ".part", base + ".json"
+
+    @contextmanager
+    def _locked(self, upload_id: str) -> Iterator[int]:
+        """Exclusive lock on the upload's part file; yields an O_APPEND descriptor to it."""
+        part, _ = self._paths(upload_id)
+        try:
+            # never O_CREAT: a committed or aborted upload must not come back empty
+            fd = os.open(part, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            raise UploadError(f"unknown upload: {upload_id}")
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)  # releases the lock
+
+    def _meta(self, upload_id: str) -> Dict[str, Any]:
+        part, sidecar = self._paths(upload_id)
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise UploadError(f"unknown upload: {upload_id}")
+        meta["offset"] = os.path.getsize(part)
+        return meta
+
+    def begin(
+        self,
+        customer_id: str,
+        kind: str,
+        total_size: Optional[int] = None,
+        sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        upload_id = uuid.uuid4().hex
+        part, sidecar = self._paths(upload_id)
+        meta = {
+            "upload_id": upload_id,
+            "customer_id": customer_id,
+            "kind": kind,
+            "total_size": total_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "created_at": time.time(),
+        }
+        open(part, "wb").close()
+        with open(sidecar, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        meta["offset"] = 0
+        return meta
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        return self._meta(upload_id)
+
+    def append(
+        self,
+        upload_id: str,
+        offset: int,
+        data: bytes,
+        chunk_sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        if len(data) > self.max_chunk_bytes:
+            raise UploadError(f"chunk of {len(data)} bytes exceeds {self.max_chunk_bytes}")
+        if chunk_sha256 and hashlib.sha256(data).hexdigest() != chunk_sha256.lower():
+            raise UploadError("chunk checksum mismatch")
+
+        with self._locked(upload_id) as fd:
+            # the sidecar is gone if a commit or abort finished while we waited for the lock
+            meta = self._meta(upload_id)
+            current = os.fstat(fd).st_size
+            if offset != current:
+                raise UploadError(f"offset mismatch: upload is at {current}, chunk starts at {offset}")
+            total = meta["total_size"]
+            if total is not None and current + len(data) > total:
+                raise UploadError(f"chunk would grow upload past its declared {total} bytes")
+
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+            meta["offset"] = current + len(data)
+        return meta
+
+    def commit(self, upload_id: str, sha256: Optional[str] = None, ext: str = "") -> BlobRef:
+        with self._locked(upload_id):
+            meta = self._meta(upload_id)
+            total = meta["total_size"]
+            if total is not None and meta["offset"] != total:
+                raise UploadError(f"upload incomplete: {meta['offset']} of {total} bytes received")
+
+            expected = (sha256 or meta["sha256"] or "").lower() or None
+            part, sidecar = self._paths(upload_id)
+            try:
+                blob = self.blobs.put_file(
+                    part, kind=meta["kind"], ext=ext, expected_digest=expected, holder=meta["customer_id"]
+                )
+            except ValueError as e:
+                raise UploadError(str(e))
+            os.remove(sidecar)
+        return blob
+
+    def abort(self, upload_id: str) -> None:
+        with self._locked(upload_id):
+            # sidecar first: a waiting append then sees an unknown upload
+            for path in reversed(self._paths(upload_id)):
+                if os.path.exists(path):
+                    os.remove(path)
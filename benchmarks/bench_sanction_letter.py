@@ -0,0 +1,80 @@
+# bench_sanction_letter.py – cold reportlab rendering vs the cached letter template
+#
+#   python benchmarks/bench_sanction_letter.py --letters 500
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MCPServer"))
+
+from pdf_render import LetterTemplate, render_sanction_letter, render_sanction_letter_cold  # noqa: E402
+
+
+def sample_fields(i: int):
+    return {
+        "date": "2026-01-15",
+        "name": f"Customer {i}",
+        "customer_id": f"CUST{i:06d}",
+        "amount": 100000 + i,
+        "tenure_months": 36,
+        "interest_rate": 12.5,
+    }
+
+
+def measure(render, letters: int, out_dir: str):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for i in range(letters):
+        with open(os.path.join(out_dir, f"letter_{i}.pdf"), "wb") as f:
+            f.write(render(sample_fields(i)))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return {
+        "letters": letters,
+        "wall_ms_per_letter": wall * 1000 / letters,
+        "cpu_ms_per_letter": cpu * 1000 / letters,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold and templated sanction letter rendering.")
+    parser.add_argument("--letters", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    build = time.perf_counter()
+    LetterTemplate()
+    build_ms = (time.perf_counter() - build) * 1000
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        # one untimed letter each so imports and font loading are not billed to either side
+        render_sanction_letter_cold(sample_fields(0))
+        render_sanction_letter(sample_fields(0))
+
+        cold = measure(render_sanction_letter_cold, args.letters, out_dir)
+        templated = measure(render_sanction_letter, args.letters, out_dir)
+
+    results = {
+        "template_build_ms": build_ms,
+        "cold": cold,
+        "templated": templated,
+        "wall_speedup": cold["wall_ms_per_letter"] / templated["wall_ms_per_letter"],
+        "cpu_speedup": cold["cpu_ms_per_letter"] / max(templated["cpu_ms_per_letter"], 1e-9),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"template build: {build_ms:.2f} ms (once per worker)")
+    for name in ("cold", "templated"):
+        r = results[name]
+        print(f"{name:>10}: {r['wall_ms_per_letter']:.3f} ms wall, {r['cpu_ms_per_letter']:.3f} ms cpu per letter")
+    print(f"speedup: {results['wall_speedup']:.1f}x wall, {results['cpu_speedup']:.1f}x cpu")
+
+
+if __name__ == "__main__":
+    main()
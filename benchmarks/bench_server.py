@@ -0,0 +1,219 @@
+# bench_server.py – latency of the MCP server's tool hot paths, in-process and over the wire
+#
+#   python benchmarks/bench_server.py --iterations 200 --json > before.json
+#   python benchmarks/bench_server.py --url http://127.0.0.1:8000/sse --json > sse.json
+#   python benchmarks/bench_server.py --compare before.json after.json
+#
+# In-process runs call the tools through FastMCP's call_tool (argument validation
+# included) against a throwaway MCP_STORAGE_DIR. With --url the same calls go through
+# an MCP client session: a URL ending in /sse uses the SSE transport, anything else
+# streamable HTTP. Results carry the git commit so runs can be compared across commits.
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MCPServer")
+sys.path.insert(0, SERVER_DIR)
+
+UPLOAD_SIZES = (1024, 64 * 1024, 1024 * 1024)
+
+# (case name, tool name, args for iteration i); customers are the server's demo seed
+UNDERWRITE_BRANCHES = (
+    ("credit_score_below_700", {"customer_id": "CUST004", "requested_amount": 50000}),
+    ("within_pre_approved_limit", {"customer_id": "CUST003", "requested_amount": 300000}),
+    ("salary_slip_required", {"customer_id": "CUST001", "requested_amount": 450000}),
+    ("emi_within_50pct_salary", {"customer_id": "CUST001", "requested_amount": 450000, "salary_provided": 100000}),
+    ("emi_exceeds_50pct_salary", {"customer_id": "CUST001", "requested_amount": 450000, "salary_provided": 20000}),
+    ("amount_exceeds_2x_pre_approved", {"customer_id": "CUST001", "requested_amount": 900000}),
+)
+
+
+def tool_cases() -> List[Tuple[str, str, Callable[[int], Dict[str, Any]]]]:
+    cases = [
+        (f"underwrite_loan[{reason}]", "underwrite_loan", lambda i, a=args: a)
+        for reason, args in UNDERWRITE_BRANCHES
+    ]
+    cases.append((
+        "verify_kyc", "verify_kyc",
+        lambda i: {"customer_id": "CUST003", "phone": "9810000003", "city": "Bengaluru"},
+    ))
+    cases.append((
+        "prequalify", "prequalify",
+        lambda i: {"customer_id": "CUST003", "phone": "9810000003", "city": "Bengaluru"},
+    ))
+    for size in UPLOAD_SIZES:
+        payload = os.urandom(size - 8)
+
+        # distinct content every call, so each one stores a new blob instead of deduplicating
+        def upload_args(i, payload=payload):
+            data = i.to_bytes(8, "big", signed=True) + payload
+            return {"customer_id": "CUST003", "content_base64": base64.b64encode(data).decode("ascii")}
+
+        cases.append((f"upload_salary_slip[{size // 1024}KiB]", "upload_salary_slip", upload_args))
+    cases.append((
+        "generate_sanction_letter", "generate_sanction_letter",
+        lambda i: {"customer_id": "CUST003", "amount": 100000 + i, "tenure_months": 36, "interest_rate": 12.5},
+    ))
+    cases.append((
+        "log_event", "log_event",
+        lambda i: {"event": {"type": "bench", "seq": i, "customer_id": "CUST003"}},
+    ))
+    return cases
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ms = np.array(samples) * 1000
+    return {
+        "iterations": len(samples),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "ops_per_sec": float(len(samples) / (ms.sum() / 1000)),
+    }
+
+
+async def run_cases(call, iterations: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, tool, make_args in tool_cases():
+        for i in range(warmup):
+            await call(tool, make_args(-1 - i))
+        samples = []
+        for i in range(iterations):
+            args = make_args(i)
+            start = time.perf_counter()
+            await call(tool, args)
+            samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+        print(f"{name:>45}: p50 {results[name]['p50_ms']:8.3f} ms", file=sys.stderr)
+    return results
+
+
+async def bench_in_process(iterations: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    import server
+
+    results = {}
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        server.compute_emi(250000 + i, 12.0, 36)
+        samples.append(time.perf_counter() - start)
+    results["compute_emi"] = summarize(samples)
+
+    async def call(tool, args):
+        await server.mcp.call_tool(tool, args)
+
+    results.update(await run_cases(call, iterations, warmup))
+    return results
+
+
+async def bench_remote(url: str, iterations: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    from mcp import ClientSession
+
+    if url.rstrip("/").endswith("/sse"):
+        from mcp.client.sse import sse_client as connect
+    else:
+        from mcp.client.streamable_http import streamablehttp_client as connect
+
+    async with connect(url) as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+
+            async def call(tool, args):
+                result = await session.call_tool(tool, args)
+                if result.isError:
+                    raise RuntimeError(f"{tool} failed: {result.content}")
+
+            return await run_cases(call, iterations, warmup)
+
+
+def git_commit() -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=SERVER_DIR, capture_output=True, text=True
+        ).stdout.strip()
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(before_path: str, after_path: str, threshold: float) -> int:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before: {before.get('commit')} ({before.get('transport')})")
+    print(f" after: {after.get('commit')} ({after.get('transport')})")
+    if before.get("transport") != after.get("transport"):
+        print("warning: comparing different transports")
+    regressions = 0
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            print(f"{name:>45}: {new['p50_ms']:8.3f} ms (new)")
+            continue
+        change = new["p50_ms"] / old["p50_ms"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:>45}: {old['p50_ms']:8.3f} -> {new['p50_ms']:8.3f} ms p50 ({change:+.1%}){flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP server tools.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--url", help="benchmark a running server, e.g. http://127.0.0.1:8000/sse")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two --json results")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown flagged by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    if args.url:
+        transport = "sse" if args.url.rstrip("/").endswith("/sse") else "streamable-http"
+        results = asyncio.run(bench_remote(args.url, args.iterations, args.warmup))
+    else:
+        os.environ.setdefault("MCP_STORAGE_DIR", tempfile.mkdtemp(prefix="bench_server_"))
+        transport = "in-process"
+        results = asyncio.run(bench_in_process(args.iterations, args.warmup))
+
+    report = {
+        **git_commit(),
+        "transport": transport,
+        "url": args.url,
+        "iterations": args.iterations,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for name, r in results.items():
+        print(
+            f"{name:>45}: mean {r['mean_ms']:8.3f}  p50 {r['p50_ms']:8.3f}  "
+            f"p95 {r['p95_ms']:8.3f}  p99 {r['p99_ms']:8.3f} ms  {r['ops_per_sec']:10.0f} ops/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
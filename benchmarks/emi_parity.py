@@ -0,0 +1,117 @@
+# emi_parity.py – exhaustive check that the float EMI paths round exactly like the Decimal reference
+#
+#   python benchmarks/emi_parity.py                       # default grid, all cores
+#   python benchmarks/emi_parity.py --principal-step 1000 --rate-step 0.01 --max-tenure 360
+#
+# Every (principal, annual rate, tenure) point of the grid is computed with
+# compute_emi_decimal, compute_emi and compute_emi_batch_values; any difference in the
+# returned float is a mismatch. Exits 1 if one is found.
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MCPServer"))
+
+from emi import compute_emi, compute_emi_batch_values, compute_emi_decimal  # noqa: E402
+
+
+def check_principals(args):
+    principals, rates, tenures = args
+    rate_grid, tenure_grid = np.meshgrid(rates, tenures, indexing="ij")
+    rate_flat = rate_grid.ravel()
+    tenure_flat = tenure_grid.ravel()
+
+    checked = 0
+    mismatches = []
+    decimal_s = scalar_s = batch_s = 0.0
+    for P in principals:
+        start = time.perf_counter()
+        batch = compute_emi_batch_values(P, rate_flat, tenure_flat)
+        batch_s += time.perf_counter() - start
+
+        for rate, n, b in zip(rate_flat.tolist(), tenure_flat.tolist(), batch.tolist()):
+            start = time.perf_counter()
+            ref = compute_emi_decimal(P, rate, n)
+            mid = time.perf_counter()
+            fast = compute_emi(P, rate, n)
+            scalar_s += time.perf_counter() - mid
+            decimal_s += mid - start
+            checked += 1
+            if fast != ref or b != ref:
+                mismatches.append({"principal": P, "annual_rate": rate, "tenure_months": n,
+                                   "decimal": ref, "float": fast, "batch": b})
+    return checked, mismatches, decimal_s, scalar_s, batch_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check float EMI against the Decimal reference.")
+    parser.add_argument("--min-principal", type=int, default=10_000)
+    parser.add_argument("--max-principal", type=int, default=5_000_000)
+    parser.add_argument("--principal-step", type=int, default=5_000)
+    parser.add_argument("--min-rate", type=float, default=6.0)
+    parser.add_argument("--max-rate", type=float, default=36.0)
+    parser.add_argument("--rate-step", type=float, default=0.25)
+    parser.add_argument("--min-tenure", type=int, default=3)
+    parser.add_argument("--max-tenure", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    principals = list(range(args.min_principal, args.max_principal + 1, args.principal_step))
+    # rates are quoted to 2 decimals, so build them from integer basis points
+    bp_step = round(args.rate_step * 100)
+    rates = np.arange(round(args.min_rate * 100), round(args.max_rate * 100) + 1, bp_step) / 100
+    tenures = np.arange(args.min_tenure, args.max_tenure + 1)
+
+    chunks = [
+        (principals[i::args.workers * 8], rates, tenures) for i in range(args.workers * 8)
+    ]
+    checked = 0
+    mismatches = []
+    decimal_s = scalar_s = batch_s = 0.0
+    wall = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for c, m, d, s, b in pool.map(check_principals, chunks):
+            checked += c
+            mismatches.extend(m)
+            decimal_s += d
+            scalar_s += s
+            batch_s += b
+    wall = time.perf_counter() - wall
+
+    results = {
+        "points": checked,
+        "grid": {
+            "principal": [args.min_principal, args.max_principal, args.principal_step],
+            "annual_rate": [args.min_rate, args.max_rate, args.rate_step],
+            "tenure_months": [args.min_tenure, args.max_tenure, 1],
+        },
+        "mismatches": len(mismatches),
+        "first_mismatches": mismatches[:20],
+        "decimal_us_per_call": decimal_s * 1e6 / checked,
+        "float_us_per_call": scalar_s * 1e6 / checked,
+        "batch_us_per_row": batch_s * 1e6 / checked,
+        "wall_seconds": wall,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"checked {checked} points in {wall:.1f}s: {len(mismatches)} mismatches")
+        print(
+            f"decimal {results['decimal_us_per_call']:.2f} us/call, "
+            f"float {results['float_us_per_call']:.2f} us/call, "
+            f"batch {results['batch_us_per_row']:.3f} us/row"
+        )
+        for m in mismatches[:20]:
+            print(m)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# test_blob_store.py – concurrency checks for the content-addressed blob store
+#
+#   python -m unittest discover -s tests
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MCPServer"))
+
+import blob_store  # noqa: E402
+from blob_store import BlobStore  # noqa: E402
+
+
+class PutAndSweepTest(unittest.TestCase):
+    data = b"%PDF-1.4 salary slip\n" * 64
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="blobs-")
+        self.store = BlobStore(self.root, durability="none")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _evict_while(self, put) -> None:
+        """
+        Pause the sweeper just before it unlinks an unreferenced blob and run put() from
+        another thread meanwhile. Whichever order the store lets them finish in, the put's
+        reference must end up pointing at a file on disk.
+        """
+        ref = self.store.put_bytes(self.data, "salary", ".pdf")
+        self.store.decref(ref.digest)
+
+        evicting = threading.Event()
+        put_done = threading.Event()
+        remove = os.remove
+
+        def paused_remove(path):
+            if threading.current_thread() is sweeper:
+                evicting.set()
+                put_done.wait(0.5)  # the put may be blocked on the sweeper; don't wait forever
+            remove(path)
+
+        def run_put():
+            put()
+            put_done.set()
+
+        sweeper = threading.Thread(target=self.store.remove_unreferenced, args=(ref.digest, ".pdf"))
+        writer = threading.Thread(target=run_put)
+        with mock.patch.object(blob_store.os, "remove", paused_remove):
+            sweeper.start()
+            self.assertTrue(evicting.wait(5), "the sweeper did not try to evict the blob")
+            writer.start()
+            sweeper.join()
+            writer.join()
+
+        self.assertIsNotNone(self.store.locate(ref.name), "put returned a reference to a deleted blob")
+        self.assertEqual(self.store.decref(ref.digest), 0)
+
+    def test_put_bytes_during_eviction_keeps_blob(self):
+        self._evict_while(lambda: self.store.put_bytes(self.data, "salary", ".pdf"))
+
+    def test_put_file_during_eviction_keeps_blob(self):
+        src = os.path.join(self.root, "upload.part")
+        with open(src, "wb") as f:
+            f.write(self.data)
+        self._evict_while(lambda: self.store.put_file(src, "salary", ".pdf"))
+
+
+class HolderReferenceTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="blobs-")
+        self.store = BlobStore(self.root, durability="none")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_each_holder_releases_only_its_own_reference(self):
+        data = b"%PDF-1.4 sanction letter\n"
+        ref = self.store.put_bytes(data, "sanction", ".pdf", holder="CUST1")
+        self.store.put_bytes(data, "sanction", ".pdf", holder="CUST1")  # same holder: still one reference
+        self.store.put_bytes(data, "sanction", ".pdf", holder="CUST2")
+
+        self.assertIsNone(self.store.decref(ref.digest, "CUST3"))
+        self.assertEqual(self.store.decref(ref.digest, "CUST1"), 1)
+        self.assertIsNone(self.store.decref(ref.digest, "CUST1"), "a second release must be refused")
+        self.assertEqual(self.store.least_recently_used_unreferenced(10), [])
+        self.assertEqual(self.store.decref(ref.digest, "CUST2"), 0)
+        self.assertEqual(self.store.least_recently_used_unreferenced(10), [(ref.digest, ".pdf")])
+
+if __name__ == "__main__":
+    unittest.main()